@@ -13,53 +13,91 @@ import (
 	"os/exec"
 	"path/filepath"
 	"runtime"
+	"strconv"
+	"strings"
 	"sync"
 )
 
 var ffmpegPath = "ffmpeg"
 
+// initFFmpeg resolves the ffmpeg binary once at start-up, so each of the many
+// ffmpeg runs (and yt-dlp, via --ffmpeg-location) skips the $PATH search.
 func initFFmpeg() {
 	if p := os.Getenv("FFMPEG_PATH"); p != "" {
 		ffmpegPath = p
+		return
+	}
+	if p, err := exec.LookPath(ffmpegPath); err == nil {
+		ffmpegPath = p
 	}
 }
 
-// fileHash produces the same hash as Python utils.py get_file_hash
+// fileHashes memoizes fileHash per (path, size, mtime) for the life of the
+// process, so analyzing the same files again skips the 2 MB read. An edited
+// file changes size or mtime and is hashed afresh.
+type fileHashKey struct {
+	path        string
+	size, mtime int64
+}
+
+var (
+	fileHashMu sync.Mutex
+	fileHashes = map[fileHashKey]string{}
+)
+
+// fileHash fingerprints an audio file from its size plus the first and last
+// 1 MB. The digest is MD5, as it has always been: it names every analysis
+// cache entry, so changing it would orphan all of them.
 func fileHash(path string) (string, error) {
-	info, err := os.Stat(path)
+	f, err := os.Open(path)
+	if err != nil {
+		return "", err
+	}
+	defer f.Close()
+
+	info, err := f.Stat()
 	if err != nil {
 		return "", err
 	}
 	size := info.Size()
+	key := fileHashKey{path, size, info.ModTime().UnixNano()}
+	fileHashMu.Lock()
+	sum, ok := fileHashes[key]
+	fileHashMu.Unlock()
+	if ok {
+		return sum, nil
+	}
 	chunkSize := int64(1024 * 1024)
 
 	h := md5.New()
-	h.Write([]byte(fmt.Sprintf("%d", size)))
+	h.Write(strconv.AppendInt(nil, size, 10))
 
-	f, err := os.Open(path)
-	if err != nil {
+	// Both ranges stream through one small buffer with positioned reads,
+	// instead of allocating a fresh 1 MB slice for the head and the tail.
+	buf := make([]byte, 64*1024)
+	if _, err := io.CopyBuffer(h, io.NewSectionReader(f, 0, chunkSize), buf); err != nil {
 		return "", err
 	}
-	defer f.Close()
-
-	head := make([]byte, chunkSize)
-	n, _ := f.Read(head)
-	h.Write(head[:n])
-
 	if size > chunkSize {
-		f.Seek(-chunkSize, io.SeekEnd)
-		tail := make([]byte, chunkSize)
-		n, _ = f.Read(tail)
-		h.Write(tail[:n])
+		if _, err := io.CopyBuffer(h, io.NewSectionReader(f, size-chunkSize, chunkSize), buf); err != nil {
+			return "", err
+		}
 	}
-	return fmt.Sprintf("%x", h.Sum(nil)), nil
+	sum = fmt.Sprintf("%x", h.Sum(nil))
+	fileHashMu.Lock()
+	if len(fileHashes) >= 1024 {
+		fileHashes = map[fileHashKey]string{} // bound memory in long sessions
+	}
+	fileHashes[key] = sum
+	fileHashMu.Unlock()
+	return sum, nil
 }
 
 // decodeToPCM decodes audio to mono float32 PCM at 22050Hz via ffmpeg
 func decodeToPCM(path string) ([]float32, int, error) {
 	sr := 22050
 	cmd := exec.Command(ffmpegPath,
-		"-v", "error",
+		"-nostdin", "-hide_banner", "-v", "error",
 		"-i", path,
 		"-f", "f32le",
 		"-acodec", "pcm_f32le",
@@ -80,25 +118,23 @@ func decodeToPCM(path string) ([]float32, int, error) {
 		return nil, 0, fmt.Errorf("start ffmpeg: %w (%s)", err, stderr.String())
 	}
 
-	data, err := io.ReadAll(stdout)
+	// Decode straight from the pipe into the sample slice: overlaying onto an
+	// empty canvas is a plain conversion, and no byte copy of the whole
+	// stream is held alongside the samples.
+	samples, numSamples, err := overlayPCM(nil, 0, stdout)
 	if err != nil {
+		cmd.Process.Kill()
+		cmd.Wait()
 		return nil, 0, fmt.Errorf("read: %w", err)
 	}
 	if waitErr := cmd.Wait(); waitErr != nil {
 		log.Printf("[ffmpeg stderr] %s", stderr.String())
 	}
 
-	numSamples := len(data) / 4
 	if numSamples == 0 {
 		return nil, 0, fmt.Errorf("no audio data decoded from %s (stderr: %s)", path, stderr.String())
 	}
 
-	samples := make([]float32, numSamples)
-	for i := 0; i < numSamples; i++ {
-		bits := binary.LittleEndian.Uint32(data[i*4 : i*4+4])
-		samples[i] = math.Float32frombits(bits)
-	}
-
 	return samples, sr, nil
 }
 
@@ -111,15 +147,32 @@ func loadCachedAnalysis(cachePath string) (*TrackAnalysis, error) {
 	if err := json.Unmarshal(data, &ta); err != nil {
 		return nil, err
 	}
+	// Entries written before the sidecar existed carry the arrays inline.
+	if ta.BeatTimes == nil && ta.Energy == nil {
+		if ta.BeatTimes, ta.Energy, err = readFloatSidecar(analysisSidecarPath(cachePath)); err != nil {
+			return nil, err
+		}
+	}
 	return &ta, nil
 }
 
 func saveCachedAnalysis(cachePath string, ta *TrackAnalysis) error {
-	data, err := json.MarshalIndent(ta, "", "  ")
+	os.MkdirAll(filepath.Dir(cachePath), 0755)
+	// beat_times and energy are the bulk of an entry (thousands of floats),
+	// so they go to a binary sidecar at 8 bytes per value with no text
+	// parsing, and the JSON keeps only the small fields. The sidecar is
+	// stored first, so a JSON entry without arrays always has one to read.
+	if err := writeFloatSidecar(analysisSidecarPath(cachePath), ta.BeatTimes, ta.Energy); err != nil {
+		return err
+	}
+	slim := *ta
+	slim.BeatTimes, slim.Energy = nil, nil
+	// Compact encoding: indentation only inflates the file and the work to
+	// parse it back.
+	data, err := json.Marshal(&slim)
 	if err != nil {
 		return err
 	}
-	os.MkdirAll(filepath.Dir(cachePath), 0755)
 	// Write to a temp file first, then rename — this is atomic on POSIX and
 	// near-atomic on Windows, preventing a half-written cache file on crash.
 	tmp := cachePath + ".tmp"
@@ -129,19 +182,83 @@ func saveCachedAnalysis(cachePath string, ta *TrackAnalysis) error {
 	return os.Rename(tmp, cachePath)
 }
 
-// AnalyzeTrack runs the full analysis pipeline on a single track
-func AnalyzeTrack(path, cacheDir string) (*TrackAnalysis, error) {
+// analysisSidecarPath is where an analysis entry keeps its beat times and
+// energy curve: "<hash>_analysis.f64" next to "<hash>_analysis.json".
+func analysisSidecarPath(cachePath string) string {
+	return strings.TrimSuffix(cachePath, ".json") + ".f64"
+}
+
+// writeFloatSidecar stores beats and energy as two little-endian uint32
+// counts followed by the values as little-endian float64s, atomically.
+func writeFloatSidecar(path string, beats, energy []float64) error {
+	buf := make([]byte, 8+8*(len(beats)+len(energy)))
+	binary.LittleEndian.PutUint32(buf[0:], uint32(len(beats)))
+	binary.LittleEndian.PutUint32(buf[4:], uint32(len(energy)))
+	off := 8
+	for _, vals := range [2][]float64{beats, energy} {
+		for _, v := range vals {
+			binary.LittleEndian.PutUint64(buf[off:], math.Float64bits(v))
+			off += 8
+		}
+	}
+	tmp := path + ".tmp"
+	if err := os.WriteFile(tmp, buf, 0644); err != nil {
+		return err
+	}
+	return os.Rename(tmp, path)
+}
+
+// readFloatSidecar is the inverse of writeFloatSidecar.
+func readFloatSidecar(path string) ([]float64, []float64, error) {
+	buf, err := os.ReadFile(path)
+	if err != nil {
+		return nil, nil, err
+	}
+	if len(buf) < 8 {
+		return nil, nil, fmt.Errorf("sidecar %s: truncated header", filepath.Base(path))
+	}
+	nb := int(binary.LittleEndian.Uint32(buf[0:]))
+	ne := int(binary.LittleEndian.Uint32(buf[4:]))
+	if len(buf) != 8+8*(nb+ne) {
+		return nil, nil, fmt.Errorf("sidecar %s: size mismatch", filepath.Base(path))
+	}
+	vals := make([]float64, nb+ne)
+	for i := range vals {
+		vals[i] = math.Float64frombits(binary.LittleEndian.Uint64(buf[8+8*i:]))
+	}
+	return vals[:nb:nb], vals[nb:], nil
+}
+
+// lookupCachedAnalysis hashes path and returns its cached analysis, if any,
+// together with the hash and cache path needed to analyze it on a miss.
+func lookupCachedAnalysis(path, cacheDir string) (*TrackAnalysis, string, string, error) {
 	hash, err := fileHash(path)
 	if err != nil {
-		return nil, fmt.Errorf("hash: %w", err)
+		return nil, "", "", fmt.Errorf("hash: %w", err)
 	}
 
 	cachePath := filepath.Join(cacheDir, hash+"_analysis.json")
 	if cached, err := loadCachedAnalysis(cachePath); err == nil {
 		log.Printf("[cache hit] %s", path)
+		return cached, hash, cachePath, nil
+	}
+	return nil, hash, cachePath, nil
+}
+
+// AnalyzeTrack runs the full analysis pipeline on a single track
+func AnalyzeTrack(path, cacheDir string) (*TrackAnalysis, error) {
+	cached, hash, cachePath, err := lookupCachedAnalysis(path, cacheDir)
+	if err != nil {
+		return nil, err
+	}
+	if cached != nil {
 		return cached, nil
 	}
+	return analyzeUncached(path, hash, cachePath)
+}
 
+// analyzeUncached decodes and analyzes a track whose cache lookup missed.
+func analyzeUncached(path, hash, cachePath string) (*TrackAnalysis, error) {
 	log.Printf("[analyzing] %s", path)
 
 	samples, sr, err := decodeToPCM(path)
@@ -150,6 +267,12 @@ func AnalyzeTrack(path, cacheDir string) (*TrackAnalysis, error) {
 	}
 
 	duration := float64(len(samples)) / float64(sr)
+
+	// Key detection (an FFT over the whole track) reads only the samples, so
+	// it runs alongside the onset/beat pipeline instead of after it.
+	keyCh := make(chan string, 1)
+	go func() { keyCh <- detectKey(samples, sr) }()
+
 	loudness := computeLoudnessDB(samples)
 
 	hopSize := 512
@@ -159,7 +282,7 @@ func AnalyzeTrack(path, cacheDir string) (*TrackAnalysis, error) {
 	bpm := estimateBPM(onset, sr, hopSize)
 	beatTimes := estimateBeatTimes(onset, sr, duration, bpm, hopSize)
 	energy := computeBeatEnergy(samples, sr, beatTimes)
-	key := detectKey(samples, sr)
+	key := <-keyCh
 
 	// Phrases: every 32 beats
 	gridSize := 32
@@ -190,27 +313,53 @@ func AnalyzeTrack(path, cacheDir string) (*TrackAnalysis, error) {
 	return ta, nil
 }
 
-// AnalyzeBatch analyzes multiple tracks in parallel
+// AnalyzeBatch analyzes multiple tracks in parallel.
+// Cache hits are resolved before a worker slot is taken, so only tracks that
+// actually need decoding compete for the bounded ffmpeg/DSP slots, and a path
+// listed more than once is analyzed once. The lookups hash each file's head
+// and tail, so they are bounded too, by their own wider limit.
 func AnalyzeBatch(paths []string, cacheDir string) ([]TrackAnalysis, []string) {
 	results := make([]TrackAnalysis, len(paths))
 	errors := make([]string, len(paths))
 	var wg sync.WaitGroup
 
+	firstIdx := make(map[string]int, len(paths))
+	dupOf := make([]int, len(paths))
+	for i, p := range paths {
+		if j, dup := firstIdx[p]; dup {
+			dupOf[i] = j
+			continue
+		}
+		firstIdx[p] = i
+		dupOf[i] = -1
+	}
+
 	// Limit concurrency: cap at 4 to avoid thrashing disk/ffmpeg on low-core machines
 	concurrency := runtime.NumCPU()
 	if concurrency > 4 {
 		concurrency = 4
 	}
 	sem := make(chan struct{}, concurrency)
+	// Lookups are short reads, so more of them may overlap, but not one per
+	// track: a cold library of thousands would open them all at once.
+	lookupSem := make(chan struct{}, 2*runtime.NumCPU())
 
 	for i, p := range paths {
+		if dupOf[i] >= 0 {
+			continue
+		}
 		wg.Add(1)
 		go func(idx int, path string) {
 			defer wg.Done()
-			sem <- struct{}{}
-			defer func() { <-sem }()
 
-			ta, err := AnalyzeTrack(path, cacheDir)
+			lookupSem <- struct{}{}
+			ta, hash, cachePath, err := lookupCachedAnalysis(path, cacheDir)
+			<-lookupSem
+			if err == nil && ta == nil {
+				sem <- struct{}{}
+				ta, err = analyzeUncached(path, hash, cachePath)
+				<-sem
+			}
 			if err != nil {
 				errors[idx] = fmt.Sprintf("%s: %v", path, err)
 				return
@@ -220,6 +369,12 @@ func AnalyzeBatch(paths []string, cacheDir string) ([]TrackAnalysis, []string) {
 	}
 	wg.Wait()
 
+	for i, j := range dupOf {
+		if j >= 0 {
+			results[i] = results[j]
+		}
+	}
+
 	// Compact errors
 	var errs []string
 	for _, e := range errors {
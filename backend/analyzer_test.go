@@ -0,0 +1,37 @@
+package main
+
+import (
+	"crypto/md5"
+	"fmt"
+	"os"
+	"path/filepath"
+	"testing"
+)
+
+// fileHash names the analysis cache entries, so its digest must not drift:
+// MD5 of the decimal size, the first 1 MB and the last 1 MB.
+func TestFileHashKeepsCacheKeys(t *testing.T) {
+	const mb = 1024 * 1024
+	for _, size := range []int{10, mb, 3*mb + 17} {
+		data := make([]byte, size)
+		for i := range data {
+			data[i] = byte(i * 31)
+		}
+		path := filepath.Join(t.TempDir(), "track.mp3")
+		if err := os.WriteFile(path, data, 0644); err != nil {
+			t.Fatal(err)
+		}
+		h := md5.New()
+		fmt.Fprintf(h, "%d", size)
+		if size > mb {
+			h.Write(data[:mb])
+			h.Write(data[size-mb:])
+		} else {
+			h.Write(data)
+		}
+		want := fmt.Sprintf("%x", h.Sum(nil))
+		if got, err := fileHash(path); err != nil || got != want {
+			t.Errorf("size %d: fileHash = %q, %v; want %q", size, got, err, want)
+		}
+	}
+}
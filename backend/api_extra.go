@@ -95,9 +95,12 @@ func addFileToZip(zw *zip.Writer, filePath, zipFilePath string) error {
 func handleCacheClear(w http.ResponseWriter, r *http.Request) {
 	clearDir(uploadsDir)
 	clearDir(outputDir)
-	// Also clean up any _preview.mp3 and _analysis.json files in cache root if they got placed there
-	clearPatternMatch(cacheDir, "*_preview.mp3")
-	clearPatternMatch(cacheDir, "*_analysis.json")
+	// Also clear the cache root: previews, analysis JSON and their .f64
+	// sidecars, and the loudness-normalized render WAVs (plus any temp files
+	// an interrupted normalization left). The in-memory index of those WAVs
+	// is reset so the next render does not trust files that are gone.
+	clearPatternMatch(cacheDir, "*_preview.mp3", "*_analysis.json", "*_analysis.f64", "norm_*.wav", "norm_*.tmp")
+	forgetNormWavs()
 
 	w.Header().Set("Content-Type", "application/json")
 	json.NewEncoder(w).Encode(map[string]bool{"success": true})
@@ -118,10 +121,22 @@ func clearDir(dirPath string) {
 	}
 }
 
-func clearPatternMatch(dirPath, pattern string) {
-	files, _ := filepath.Glob(filepath.Join(dirPath, pattern))
-	for _, f := range files {
-		os.Remove(f)
+// clearPatternMatch removes the files in dirPath matching any of patterns,
+// reading the directory once rather than once per pattern.
+func clearPatternMatch(dirPath string, patterns ...string) {
+	d, err := os.Open(dirPath)
+	if err != nil {
+		return
+	}
+	names, _ := d.Readdirnames(-1)
+	d.Close()
+	for _, name := range names {
+		for _, pattern := range patterns {
+			if ok, _ := filepath.Match(pattern, name); ok {
+				os.Remove(filepath.Join(dirPath, name))
+				break
+			}
+		}
 	}
 }
 
@@ -1,16 +1,21 @@
 package main
 
 import (
+	"bufio"
 	"bytes"
+	"crypto/sha256"
+	"encoding/hex"
 	"encoding/json"
 	"fmt"
 	"io"
 	"log"
 	"net/http"
+	neturl "net/url"
 	"os"
 	"os/exec"
 	"path/filepath"
 	"runtime"
+	"strconv"
 	"strings"
 	"sync"
 	"sync/atomic"
@@ -266,7 +271,6 @@ func DownloadYouTubePlaylist(url, outputDir string, maxTracks int) ([]Downloaded
 	// URLs are served from a different infrastructure and are far less likely
 	// to be rate-limited or 403'd by YouTube's bot-detection.
 	baseArgs := []string{
-		url,
 		"--format", "bestaudio[ext=m4a]/bestaudio[ext=webm]/bestaudio",
 		"--extract-audio",
 		"--audio-format", "mp3",
@@ -279,20 +283,412 @@ func DownloadYouTubePlaylist(url, outputDir string, maxTracks int) ([]Downloaded
 		"--add-metadata",
 		"--retries", "5",
 		"--fragment-retries", "5",
-		"--print", "after_move:filepath",
+		// Fetch DASH/HLS fragments 4 at a time and pull plain streams in
+		// 10 MB ranges over the same keep-alive connection, rather than
+		// one fragment or one throttled stream at a time.
+		"--concurrent-fragments", "4",
+		"--http-chunk-size", "10M",
+		"--socket-timeout", "30",
+		"--print", "after_move:%(id)s\t%(filepath)s",
 	}
-	if maxTracks > 0 {
-		baseArgs = append(baseArgs, "--playlist-end", fmt.Sprintf("%d", maxTracks))
+	if filepath.IsAbs(ffmpegPath) {
+		baseArgs = append(baseArgs, "--ffmpeg-location", ffmpegPath)
+	}
+
+	// ── Step 1: start the download workers ────────────────────────────────
+	//
+	// Each track is network-bound followed by an MP3 encode, so several
+	// yt-dlp processes overlap well. Kept small: YouTube throttles clients
+	// that open many connections from one IP.
+	type job struct {
+		args []string
+		out  []byte
+		err  error
+	}
+	var (
+		jobsMu sync.Mutex
+		jobs   []*job
+		wg     sync.WaitGroup
+		// Workers share the rate-limit retry stage: once one of them needs
+		// request delays to get through, the others start with delays
+		// instead of each failing through the default stage first.
+		stage atomic.Int32
+	)
+	runJob := func(args []string, batch []playlistEntry) {
+		j := &job{args: args}
+		j.out, j.err = runYtdlpStages(args, batch, &stage)
+		jobsMu.Lock()
+		jobs = append(jobs, j)
+		jobsMu.Unlock()
+	}
+	queue := make(chan playlistEntry, 256)
+	workers := downloadWorkers()
+	log.Printf("[yt-dlp] downloading with %d worker(s)", workers)
+	for w := 0; w < workers; w++ {
+		wg.Add(1)
+		go func() {
+			defer wg.Done()
+			// A worker takes the next video plus whatever else is already
+			// queued (up to maxDownloadBatch) into one yt-dlp run, so
+			// extractor start-up, cookie loading and the connection to the
+			// CDN are shared by the batch rather than paid per track.
+			for e := range queue {
+				args := append(append([]string{}, baseArgs...), "--no-playlist")
+				batch := []playlistEntry{e}
+			fill:
+				for n := 1; n < maxDownloadBatch; n++ {
+					select {
+					case next, ok := <-queue:
+						if !ok {
+							break fill
+						}
+						batch = append(batch, next)
+					default:
+						break fill
+					}
+				}
+				runJob(args, batch)
+			}
+		}()
 	}
 
-	// ── Multi-stage retry strategy ────────────────────────────────────────
+	// ── Step 2: list the playlist, feeding the workers as it goes ─────────
 	//
-	// YouTube 403 Forbidden errors most commonly come from:
-	//   a) Bot detection on bulk playlist downloads → add request delays
-	//   b) Authentication requirement (members-only, age-restricted)
-	//      → browser cookie fallback
+	// A flat listing only fetches the playlist pages, not every video, and
+	// each entry is queued the moment yt-dlp prints it, so the first tracks
+	// download while a long playlist is still being listed. Videos fetched
+	// by an earlier request are answered from the download index as long as
+	// their file is still there; only the rest are queued.
+	onDisk := audioFileIndex(outputDir)
+	known := loadDownloadIndex(outputDir)
+	names := map[string]string{}
+	entries := listPlaylist(url, outputDir, maxTracks, func(e playlistEntry) {
+		if name, ok := known[e.ID]; ok && onDisk[name] {
+			names[e.ID] = name
+			return
+		}
+		queue <- e
+	})
+	close(queue)
+	ids := make([]string, len(entries))
+	listed := make(map[string]bool, len(entries))
+	for i, e := range entries {
+		ids[i] = e.ID
+		listed[e.ID] = true
+	}
+	if len(names) > 0 {
+		log.Printf("[yt-dlp] %d of %d track(s) already downloaded", len(names), len(ids))
+	}
+	// If listing failed (or the URL is not something yt-dlp can list), fall
+	// back to handing the whole URL to one process.
+	if len(ids) == 0 {
+		args := append(append([]string{}, baseArgs...), url)
+		if maxTracks > 0 {
+			args = append(args, "--playlist-end", fmt.Sprintf("%d", maxTracks))
+		}
+		runJob(args, nil)
+	}
+	wg.Wait()
+
+	// ── Step 3: collect results in playlist order ─────────────────────────
 	//
-	// We stop as soon as stdout contains at least one downloaded file path.
+	// Every line is "<id>\t<path>" from --print after_move, so each video
+	// maps straight to its final file: no directory scan or title matching.
+	var firstErr error
+	fetched := map[string]string{}
+	for _, j := range jobs {
+		if j.err != nil && firstErr == nil {
+			firstErr = j.err
+		}
+		for _, line := range strings.Split(string(j.out), "\n") {
+			id, path, ok := strings.Cut(strings.TrimRight(line, "\r"), "\t")
+			if !ok || id == "" || path == "" {
+				continue
+			}
+			if _, dup := names[id]; dup {
+				continue
+			}
+			names[id] = filepath.Base(path)
+			fetched[id] = names[id]
+			if !listed[id] {
+				// Whole-URL fallback, or an extractor whose flat listing
+				// names the entry differently: keep yt-dlp's order.
+				ids = append(ids, id)
+			}
+		}
+	}
+
+	if len(fetched) > 0 {
+		if err := recordDownloads(outputDir, fetched); err != nil {
+			log.Printf("[yt-dlp] could not update download index: %v", err)
+		}
+		// One directory read answers "is it on disk?" for every new
+		// track, rather than a stat per file.
+		onDisk = audioFileIndex(outputDir)
+	}
+	var files []DownloadedFile
+	seen := map[string]bool{}
+	for _, id := range ids {
+		name, ok := names[id]
+		if !ok || seen[id] {
+			continue
+		}
+		seen[id] = true
+
+		if !onDisk[name] {
+			log.Printf("[yt-dlp] file not found on disk: %s", name)
+			continue
+		}
+		absPath := filepath.Join(outputDir, name)
+		title := strings.TrimSuffix(name, filepath.Ext(name))
+		title = strings.ReplaceAll(title, "_", " ")
+		files = append(files, DownloadedFile{Path: absPath, Filename: name, Title: title})
+		log.Printf("[yt-dlp] ready: %s", name)
+	}
+
+	if len(files) == 0 && firstErr != nil {
+		return nil, fmt.Errorf("yt-dlp failed after all attempts: %w", firstErr)
+	}
+
+	return files, nil
+}
+
+// downloadIndexName is the file in a download directory that maps YouTube
+// video IDs to the file each was saved as.
+const downloadIndexName = ".downloads.json"
+
+// downloadIndexMu serializes read-modify-write cycles on download indexes.
+var downloadIndexMu sync.Mutex
+
+// loadDownloadIndex reads dir's video ID → file name index. A missing or
+// unreadable index is empty: the videos are simply downloaded again.
+func loadDownloadIndex(dir string) map[string]string {
+	downloadIndexMu.Lock()
+	defer downloadIndexMu.Unlock()
+	return readDownloadIndex(dir)
+}
+
+func readDownloadIndex(dir string) map[string]string {
+	index := map[string]string{}
+	if data, err := os.ReadFile(filepath.Join(dir, downloadIndexName)); err == nil {
+		json.Unmarshal(data, &index)
+	}
+	return index
+}
+
+// recordDownloads merges fetched into dir's download index, atomically.
+func recordDownloads(dir string, fetched map[string]string) error {
+	downloadIndexMu.Lock()
+	defer downloadIndexMu.Unlock()
+	index := readDownloadIndex(dir)
+	for id, name := range fetched {
+		index[id] = name
+	}
+	data, err := json.Marshal(index)
+	if err != nil {
+		return err
+	}
+	path := filepath.Join(dir, downloadIndexName)
+	tmp := path + ".tmp"
+	if err := os.WriteFile(tmp, data, 0644); err != nil {
+		return err
+	}
+	return os.Rename(tmp, path)
+}
+
+// audioExts are the extensions a downloaded track can end up with.
+var audioExts = [...]string{".mp3", ".webm", ".m4a", ".opus", ".ogg"}
+
+// audioFileIndex lists the audio files directly inside dir by name. Only the
+// directory itself is read: no per-file stat.
+func audioFileIndex(dir string) map[string]bool {
+	entries, err := os.ReadDir(dir)
+	if err != nil {
+		return nil
+	}
+	index := make(map[string]bool, len(entries))
+	for _, e := range entries {
+		if e.IsDir() {
+			continue
+		}
+		ext := strings.ToLower(filepath.Ext(e.Name()))
+		for _, a := range audioExts {
+			if ext == a {
+				index[e.Name()] = true
+				break
+			}
+		}
+	}
+	return index
+}
+
+// downloadWorkers is how many yt-dlp processes run at once.
+// DJBOT_YTDLP_WORKERS overrides the default of 3.
+func downloadWorkers() int {
+	if n, err := strconv.Atoi(os.Getenv("DJBOT_YTDLP_WORKERS")); err == nil && n > 0 {
+		return n
+	}
+	return 3
+}
+
+// ytdlpCommand builds a yt-dlp command that prints real UTF-8 on every platform.
+func ytdlpCommand(args ...string) *exec.Cmd {
+	cmd := exec.Command(getYtdlpPath(), args...)
+	hideWindow(cmd)
+	cmd.Env = append(os.Environ(), "PYTHONUTF8=1", "PYTHONIOENCODING=utf-8")
+	return cmd
+}
+
+// playlistListingTTL is how long a cached playlist listing is trusted.
+// Playlists rarely change within the hour, and a stale listing only means a
+// just-added track is picked up on the next refresh.
+const playlistListingTTL = time.Hour
+
+// playlistListingPath is where the listing of rawURL (up to maxTracks
+// entries) is cached under dir. The key is the normalized URL, so share links
+// that differ only in tracking parameters hit the same entry.
+func playlistListingPath(dir, rawURL string, maxTracks int) string {
+	sum := sha256.Sum256([]byte(normalizeListingURL(rawURL) + "|" + strconv.Itoa(maxTracks)))
+	return filepath.Join(dir, ".meta", hex.EncodeToString(sum[:8])+".json")
+}
+
+// listingURLNoise are query parameters that do not change what a URL lists:
+// share/tracking tags and the position a link was copied at.
+var listingURLNoise = map[string]bool{
+	"si": true, "index": true, "pp": true, "feature": true, "t": true,
+	"start_radio": true, "ab_channel": true,
+}
+
+// normalizeListingURL lower-cases the scheme and host and drops the
+// listingURLNoise and utm_* parameters; the rest are re-encoded in sorted
+// order. A URL that does not parse is returned unchanged.
+func normalizeListingURL(rawURL string) string {
+	u, err := neturl.Parse(strings.TrimSpace(rawURL))
+	if err != nil || u.Host == "" {
+		return rawURL
+	}
+	u.Scheme = strings.ToLower(u.Scheme)
+	u.Host = strings.ToLower(u.Host)
+	q := u.Query()
+	for k := range q {
+		if listingURLNoise[k] || strings.HasPrefix(k, "utm_") {
+			q.Del(k)
+		}
+	}
+	u.RawQuery = q.Encode()
+	u.Fragment = ""
+	return u.String()
+}
+
+// maxDownloadBatch caps how many queued videos one yt-dlp run takes on.
+const maxDownloadBatch = 8
+
+// playlistEntry is one item of a flat playlist listing: its ID, used to
+// match downloads and the download index, and the URL to fetch it from.
+type playlistEntry struct {
+	ID  string `json:"id"`
+	URL string `json:"url"`
+}
+
+// listPlaylist lists the entries of a playlist (or the single entry of a
+// video URL), honouring maxTracks, and returns them in order. Each entry is
+// passed to emit as soon as it is known. Entry URLs are the page URLs the
+// extractor lists, not YouTube watch URLs built from IDs. Listings are cached
+// under dir for playlistListingTTL, so downloading the same playlist again
+// does not wait on the site just to learn what it holds. It returns nil when
+// listing fails.
+func listPlaylist(url, dir string, maxTracks int, emit func(playlistEntry)) []playlistEntry {
+	cachePath := playlistListingPath(dir, url, maxTracks)
+	if info, err := os.Stat(cachePath); err == nil && time.Since(info.ModTime()) < playlistListingTTL {
+		var entries []playlistEntry
+		if data, err := os.ReadFile(cachePath); err == nil && json.Unmarshal(data, &entries) == nil && len(entries) > 0 {
+			log.Printf("[yt-dlp] using cached playlist listing (%d track(s))", len(entries))
+			for _, e := range entries {
+				emit(e)
+			}
+			return entries
+		}
+	}
+
+	// A playlist's entries are "url" references to each item's page. A URL
+	// naming a single item has nothing to flatten, so yt-dlp extracts it in
+	// full and %(url)s is then a media URL (or NA): queue the input instead.
+	args := []string{"--flat-playlist", "--print", "%(_type)s\t%(id)s\t%(url)s", "--ignore-errors"}
+	if maxTracks > 0 {
+		args = append(args, "--playlist-end", fmt.Sprintf("%d", maxTracks))
+	}
+	cmd := ytdlpCommand(append(args, url)...)
+	var stderr bytes.Buffer
+	cmd.Stderr = &stderr
+	stdout, err := cmd.StdoutPipe()
+	if err != nil {
+		log.Printf("[yt-dlp] playlist listing failed: %v", err)
+		return nil
+	}
+	if err := cmd.Start(); err != nil {
+		log.Printf("[yt-dlp] playlist listing failed: %v", err)
+		return nil
+	}
+	var entries []playlistEntry
+	sc := bufio.NewScanner(stdout)
+	for sc.Scan() {
+		kind, rest, _ := strings.Cut(strings.TrimSpace(sc.Text()), "\t")
+		id, entryURL, _ := strings.Cut(rest, "\t")
+		if kind != "url" && kind != "url_transparent" {
+			entryURL = url
+		}
+		// yt-dlp prints NA for a field the extractor did not provide.
+		if id == "" || id == "NA" || entryURL == "" || entryURL == "NA" {
+			continue
+		}
+		if maxTracks > 0 && len(entries) >= maxTracks {
+			continue
+		}
+		e := playlistEntry{ID: id, URL: entryURL}
+		entries = append(entries, e)
+		emit(e)
+	}
+	err = cmd.Wait()
+	if len(entries) == 0 {
+		log.Printf("[yt-dlp] playlist listing failed: %v\nstderr: %s", err, stderr.String())
+		return nil
+	}
+	if err != nil {
+		// Some pages listed before the failure: download those, but do not
+		// cache a possibly truncated listing as the playlist for an hour.
+		log.Printf("[yt-dlp] playlist listing incomplete after %d track(s): %v\nstderr: %s", len(entries), err, stderr.String())
+		return entries
+	}
+
+	if data, err := json.Marshal(entries); err == nil && os.MkdirAll(filepath.Dir(cachePath), 0755) == nil {
+		tmp := cachePath + ".tmp"
+		if os.WriteFile(tmp, data, 0644) == nil {
+			os.Rename(tmp, cachePath)
+		}
+	}
+	return entries
+}
+
+// runYtdlpStages runs yt-dlp with args through the retry stages below,
+// starting at *first. With a batch, the batch's URLs are appended to args
+// and every stage retries only the entries that have not printed an
+// after_move line yet, so one video that needs cookies does not hold back
+// the rest of its batch, nor do they stop it from reaching that stage. The
+// returned stdout is that of every stage combined. Without a batch, args
+// already carry the URL and the first stage that downloads anything wins.
+//
+// Only the rate-limit escalation is shared through *first: once a worker
+// needed request delays to get anything through, the site is throttling this
+// IP and every worker starts at the slow stage. The cookie stages stay per
+// batch, since a members-only or age-restricted video says nothing about the
+// rest of the playlist, and public videos should not go out with the user's
+// account cookies (or fail when those cannot be decrypted).
+//
+// YouTube 403 Forbidden errors most commonly come from:
+//   - Bot detection on bulk playlist downloads → add request delays
+//   - Authentication requirement (members-only, age-restricted)
+//     → browser cookie fallback
+func runYtdlpStages(baseArgs []string, batch []playlistEntry, first *atomic.Int32) ([]byte, error) {
 	type retryStage struct {
 		label     string
 		extraArgs []string
@@ -307,72 +703,95 @@ func DownloadYouTubePlaylist(url, outputDir string, maxTracks int) ([]Downloaded
 		{label: "edge", extraArgs: []string{"--cookies-from-browser", "edge"}},
 		{label: "firefox", extraArgs: []string{"--cookies-from-browser", "firefox"}},
 	}
+	const maxSharedStage = 1 // "slow"
 
-	var lastOut []byte
+	var allOut []byte
 	var lastErr error
+	pending := batch
 
-	for _, stage := range stages {
-		args := make([]string, len(baseArgs))
+	for i := int(first.Load()); i < len(stages); i++ {
+		stage := stages[i]
+		args := make([]string, len(baseArgs), len(baseArgs)+len(stage.extraArgs)+len(pending))
 		copy(args, baseArgs)
 		args = append(args, stage.extraArgs...)
+		for _, e := range pending {
+			args = append(args, e.URL)
+		}
 
 		log.Printf("[yt-dlp] [%s] attempting download...", stage.label)
-		cmd := exec.Command(getYtdlpPath(), args...)
-		hideWindow(cmd)
-		// Force UTF-8 output from Python/yt-dlp on every platform.
-		cmd.Env = append(os.Environ(), "PYTHONUTF8=1", "PYTHONIOENCODING=utf-8")
+		cmd := ytdlpCommand(args...)
 
 		var stderr bytes.Buffer
 		cmd.Stderr = &stderr
 		out, err := cmd.Output()
-		lastOut = out
+		allOut = append(allOut, out...)
 		lastErr = err
 
 		if len(out) > 0 {
-			log.Printf("[yt-dlp] [%s] success — %d file(s) downloaded", stage.label, strings.Count(strings.TrimSpace(string(out)), "\n")+1)
-			break
+			// Count lines on the byte slice: no string copy of the whole
+			// output just to produce a log argument.
+			log.Printf("[yt-dlp] [%s] success — %d file(s) downloaded", stage.label, bytes.Count(bytes.TrimSpace(out), []byte{'\n'})+1)
+			progressed := true
+			if batch != nil {
+				if out[len(out)-1] != '\n' {
+					allOut = append(allOut, '\n')
+				}
+				rest := unfinishedEntries(pending, out)
+				progressed = len(rest) < len(pending)
+				pending = rest
+			}
+			// Raise the shared stage, never lower it, and only for a stage
+			// that actually got a video through.
+			shared := int32(i)
+			if shared > maxSharedStage {
+				shared = maxSharedStage
+			}
+			if progressed {
+				for cur := first.Load(); shared > cur; cur = first.Load() {
+					if first.CompareAndSwap(cur, shared) {
+						break
+					}
+				}
+			}
+			if batch == nil {
+				break
+			}
+			if len(pending) == 0 {
+				lastErr = nil
+				break
+			}
+			log.Printf("[yt-dlp] [%s] %d video(s) still missing, retrying them at the next stage", stage.label, len(pending))
 		}
 
 		errStr := stderr.String()
-		log.Printf("[yt-dlp] [%s] failed: %v\nstderr: %s", stage.label, err, errStr)
-	}
-
-	out := lastOut
-	err := lastErr
-
-	// Parse stdout: each line is an absolute path printed by --print after_move:filepath
-	var files []DownloadedFile
-	seen := map[string]bool{}
-	for _, line := range strings.Split(strings.TrimSpace(string(out)), "\n") {
-		line = strings.TrimSpace(strings.TrimRight(line, "\r"))
-		if line == "" {
-			continue
+		if len(out) == 0 {
+			log.Printf("[yt-dlp] [%s] failed: %v\nstderr: %s", stage.label, err, errStr)
 		}
-		name := filepath.Base(line)
-		if seen[name] {
-			continue
+		if err != nil {
+			// cmd.Stderr is our buffer, so ExitError.Stderr stays empty:
+			// carry the captured text in the error for the final report.
+			lastErr = fmt.Errorf("%w\n%s", err, strings.TrimSpace(errStr))
 		}
-		seen[name] = true
+	}
+	return allOut, lastErr
+}
 
-		absPath := filepath.Join(outputDir, name)
-		if _, statErr := os.Stat(absPath); statErr != nil {
-			log.Printf("[yt-dlp] file not found on disk: %s", name)
-			continue
+// unfinishedEntries returns the entries of batch whose ID has no
+// "<id>\t<path>" after_move line in out.
+func unfinishedEntries(batch []playlistEntry, out []byte) []playlistEntry {
+	done := map[string]bool{}
+	for _, line := range strings.Split(string(out), "\n") {
+		if id, path, ok := strings.Cut(strings.TrimRight(line, "\r"), "\t"); ok && path != "" {
+			done[id] = true
 		}
-		title := strings.TrimSuffix(name, filepath.Ext(name))
-		title = strings.ReplaceAll(title, "_", " ")
-		files = append(files, DownloadedFile{Path: absPath, Filename: name, Title: title})
-		log.Printf("[yt-dlp] ready: %s", name)
 	}
-
-	if len(files) == 0 && err != nil {
-		if exitErr, ok := err.(*exec.ExitError); ok {
-			return nil, fmt.Errorf("yt-dlp failed after all attempts: %w\n%s", err, string(exitErr.Stderr))
+	var rest []playlistEntry
+	for _, e := range batch {
+		if !done[e.ID] {
+			rest = append(rest, e)
 		}
-		return nil, fmt.Errorf("yt-dlp failed after all attempts: %w", err)
 	}
-
-	return files, nil
+	return rest
 }
 
 // handleDownloadYouTube handles POST /download/youtube
@@ -0,0 +1,334 @@
+package main
+
+import (
+	"os"
+	"path/filepath"
+	"runtime"
+	"strconv"
+	"strings"
+	"sync/atomic"
+	"testing"
+)
+
+func TestNormalizeListingURL(t *testing.T) {
+	base := "https://www.youtube.com/playlist?list=PL123"
+	for _, in := range []string{
+		base,
+		"https://www.youtube.com/playlist?list=PL123&si=abcDEF",
+		"HTTPS://WWW.YouTube.com/playlist?si=x&list=PL123&index=4&utm_source=share",
+		" https://www.youtube.com/playlist?list=PL123#frag ",
+	} {
+		if got := normalizeListingURL(in); got != base {
+			t.Errorf("normalizeListingURL(%q) = %q, want %q", in, got, base)
+		}
+	}
+	if a, b := normalizeListingURL(base), normalizeListingURL("https://www.youtube.com/playlist?list=PL999"); a == b {
+		t.Error("different playlists normalized to the same key")
+	}
+}
+
+func TestUnfinishedEntries(t *testing.T) {
+	batch := []playlistEntry{{ID: "a", URL: "u/a"}, {ID: "b", URL: "u/b"}, {ID: "c", URL: "u/c"}}
+	out := []byte("a\t/music/A.mp3\r\nnoise line\nc\t\n")
+	rest := unfinishedEntries(batch, out)
+	if len(rest) != 2 || rest[0].ID != "b" || rest[1].ID != "c" {
+		t.Errorf("unfinishedEntries = %+v, want b and c", rest)
+	}
+	if rest := unfinishedEntries(batch[:1], out); len(rest) != 0 {
+		t.Errorf("unfinishedEntries = %+v, want none", rest)
+	}
+}
+
+// fakeYtdlpScript stands in for yt-dlp. A flat listing prints the
+// "_type\tid\turl" lines of $FAKE_YTDLP_DIR/listing (and fails when there is
+// none); a download creates
+// Song_<id>.mp3 in the --output directory for every fake.test URL it is given
+// and prints it the way --print after_move does. The whole-playlist URL
+// downloads the ids in $FAKE_YTDLP_DIR/all, an id with a cookies_<id> file
+// only downloads with --cookies-from-browser, and one with a blocked_<id>
+// file never downloads but still prints a line. Every call is logged.
+const fakeYtdlpScript = `#!/bin/sh
+printf '%s\n' "$*" >> "$FAKE_YTDLP_DIR/calls"
+out=""; prev=""; flat=0; cookies=0; end=""
+for a in "$@"; do
+	case "$prev" in
+	--output) out=$(dirname "$a") ;;
+	--playlist-end) end=$a ;;
+	esac
+	case "$a" in
+	--flat-playlist) flat=1 ;;
+	--cookies-from-browser) cookies=1 ;;
+	esac
+	prev=$a
+done
+if [ $flat = 1 ]; then
+	[ -f "$FAKE_YTDLP_DIR/listing" ] || { echo "ERROR: Unsupported URL" >&2; exit 1; }
+	cat "$FAKE_YTDLP_DIR/listing"
+	exit 0
+fi
+status=0
+fetch() {
+	if [ -f "$FAKE_YTDLP_DIR/blocked_$1" ]; then
+		echo "[download] $1: nothing downloaded"
+		echo "ERROR: [$1] Video unavailable" >&2
+		status=1
+		return
+	fi
+	if [ -f "$FAKE_YTDLP_DIR/cookies_$1" ] && [ $cookies = 0 ]; then
+		echo "ERROR: [$1] Sign in to confirm you're not a bot" >&2
+		status=1
+		return
+	fi
+	: > "$out/Song_$1.mp3"
+	printf '%s\t%s\n' "$1" "$out/Song_$1.mp3"
+}
+for a in "$@"; do
+	case "$a" in
+	https://fake.test/watch/*) fetch "${a##*/}" ;;
+	https://fake.test/playlist)
+		n=0
+		for id in $(cat "$FAKE_YTDLP_DIR/all"); do
+			n=$((n+1))
+			if [ -n "$end" ] && [ $n -gt $end ]; then break; fi
+			fetch "$id"
+		done ;;
+	esac
+done
+exit $status
+`
+
+const fakePlaylistURL = "https://fake.test/playlist"
+
+// useFakeYtdlp installs fakeYtdlpScript as yt-dlp for the test. listed is the
+// flat listing (nil makes listing fail), all what the whole playlist URL
+// downloads. It returns the directory holding the fake's files.
+func useFakeYtdlp(t *testing.T, workers int, listed, all []string) string {
+	t.Helper()
+	if runtime.GOOS == "windows" {
+		t.Skip("fake yt-dlp is a shell script")
+	}
+	dir := t.TempDir()
+	script := filepath.Join(dir, "yt-dlp")
+	if err := os.WriteFile(script, []byte(fakeYtdlpScript), 0755); err != nil {
+		t.Fatal(err)
+	}
+	if listed != nil {
+		var b strings.Builder
+		for _, id := range listed {
+			b.WriteString("url\t" + id + "\thttps://fake.test/watch/" + id + "\n")
+		}
+		if err := os.WriteFile(filepath.Join(dir, "listing"), []byte(b.String()), 0644); err != nil {
+			t.Fatal(err)
+		}
+	}
+	if err := os.WriteFile(filepath.Join(dir, "all"), []byte(strings.Join(all, "\n")), 0644); err != nil {
+		t.Fatal(err)
+	}
+	t.Setenv("FAKE_YTDLP_DIR", dir)
+	t.Setenv("DJBOT_YTDLP_WORKERS", strconv.Itoa(workers))
+	old := getYtdlpPath()
+	setYtdlpPath(script)
+	t.Cleanup(func() { setYtdlpPath(old) })
+	return dir
+}
+
+// fakeCalls returns the fake yt-dlp's logged command lines and resets the log.
+func fakeCalls(t *testing.T, dir string) []string {
+	t.Helper()
+	data, err := os.ReadFile(filepath.Join(dir, "calls"))
+	if err != nil && !os.IsNotExist(err) {
+		t.Fatal(err)
+	}
+	os.Remove(filepath.Join(dir, "calls"))
+	return strings.Split(strings.TrimSpace(string(data)), "\n")
+}
+
+// callsWith counts the calls whose command line contains every one of subs.
+func callsWith(calls []string, subs ...string) int {
+	n := 0
+	for _, c := range calls {
+		all := true
+		for _, s := range subs {
+			all = all && strings.Contains(c, s)
+		}
+		if all {
+			n++
+		}
+	}
+	return n
+}
+
+func fileNames(files []DownloadedFile) []string {
+	var names []string
+	for _, f := range files {
+		names = append(names, f.Filename)
+	}
+	return names
+}
+
+func TestDownloadPlaylist(t *testing.T) {
+	for _, tc := range []struct {
+		name      string
+		listed    []string
+		all       []string
+		cookies   []string
+		maxTracks int
+		want      []string
+		check     func(t *testing.T, calls []string)
+	}{
+		{
+			name:   "listed ids map to their files in playlist order",
+			listed: []string{"c", "a", "b"},
+			want:   []string{"Song_c.mp3", "Song_a.mp3", "Song_b.mp3"},
+			check: func(t *testing.T, calls []string) {
+				if n := callsWith(calls, "fake.test/playlist", "--flat-playlist"); n != 1 {
+					t.Errorf("%d flat listing call(s), want 1", n)
+				}
+			},
+		},
+		{
+			name:    "unfinished videos of a batch retry at the next stage",
+			listed:  []string{"a", "b", "c"},
+			cookies: []string{"b"},
+			want:    []string{"Song_a.mp3", "Song_b.mp3", "Song_c.mp3"},
+			check: func(t *testing.T, calls []string) {
+				for _, id := range []string{"a", "c"} {
+					if n := callsWith(calls, "watch/"+id); n != 1 {
+						t.Errorf("%s downloaded in %d call(s), want 1", id, n)
+					}
+				}
+				if n := callsWith(calls, "watch/b", "--cookies-from-browser chrome"); n != 1 {
+					t.Errorf("b tried with chrome cookies %d time(s), want 1", n)
+				}
+				if n := callsWith(calls, "--cookies-from-browser edge"); n != 0 {
+					t.Errorf("%d call(s) went past the chrome stage", n)
+				}
+			},
+		},
+		{
+			name:      "an empty listing falls back to the whole URL",
+			all:       []string{"z", "x", "y"},
+			maxTracks: 2,
+			want:      []string{"Song_z.mp3", "Song_x.mp3"},
+			check: func(t *testing.T, calls []string) {
+				if n := callsWith(calls, fakePlaylistURL, "--playlist-end 2"); n != 2 {
+					// One failed listing, one whole-URL download.
+					t.Errorf("%d call(s) limited to 2 tracks, want 2", n)
+				}
+			},
+		},
+	} {
+		t.Run(tc.name, func(t *testing.T) {
+			fake := useFakeYtdlp(t, 1, tc.listed, tc.all)
+			for _, id := range tc.cookies {
+				os.WriteFile(filepath.Join(fake, "cookies_"+id), nil, 0644)
+			}
+			out := t.TempDir()
+			files, err := DownloadYouTubePlaylist(fakePlaylistURL, out, tc.maxTracks)
+			if err != nil {
+				t.Fatal(err)
+			}
+			if got := fileNames(files); strings.Join(got, ",") != strings.Join(tc.want, ",") {
+				t.Fatalf("files = %v, want %v", got, tc.want)
+			}
+			for _, f := range files {
+				id := strings.TrimSuffix(strings.TrimPrefix(f.Filename, "Song_"), ".mp3")
+				if f.Path != filepath.Join(out, f.Filename) || f.Title != "Song "+id {
+					t.Errorf("file %+v: wrong path or title", f)
+				}
+			}
+			index := loadDownloadIndex(out)
+			for _, name := range tc.want {
+				id := strings.TrimSuffix(strings.TrimPrefix(name, "Song_"), ".mp3")
+				if index[id] != name {
+					t.Errorf("download index[%s] = %q, want %q", id, index[id], name)
+				}
+			}
+			tc.check(t, fakeCalls(t, fake))
+		})
+	}
+}
+
+func TestDownloadPlaylistSkipsKnownDownloads(t *testing.T) {
+	fake := useFakeYtdlp(t, 2, []string{"a", "b", "c"}, nil)
+	out := t.TempDir()
+	if _, err := DownloadYouTubePlaylist(fakePlaylistURL, out, 0); err != nil {
+		t.Fatal(err)
+	}
+	fakeCalls(t, fake)
+
+	// b's file went away: only b is fetched again, and the cached listing
+	// answers without another flat listing.
+	os.Remove(filepath.Join(out, "Song_b.mp3"))
+	files, err := DownloadYouTubePlaylist(fakePlaylistURL, out, 0)
+	if err != nil {
+		t.Fatal(err)
+	}
+	if got := strings.Join(fileNames(files), ","); got != "Song_a.mp3,Song_b.mp3,Song_c.mp3" {
+		t.Fatalf("files = %s", got)
+	}
+	calls := fakeCalls(t, fake)
+	if len(calls) != 1 || callsWith(calls, "watch/b") != 1 {
+		t.Errorf("calls = %q, want a single download of b", calls)
+	}
+}
+
+// A URL naming a single item is extracted in full even with --flat-playlist,
+// so its %(url)s is a media URL or NA; the input URL is queued instead.
+func TestDownloadSingleItemQueuesInputURL(t *testing.T) {
+	for name, mediaURL := range map[string]string{"no url": "NA", "media url": "https://cdn.fake.test/solo/playlist.m3u8"} {
+		t.Run(name, func(t *testing.T) {
+			fake := useFakeYtdlp(t, 1, nil, nil)
+			os.WriteFile(filepath.Join(fake, "listing"), []byte("video\tsolo\t"+mediaURL+"\n"), 0644)
+			files, err := DownloadYouTubePlaylist("https://fake.test/watch/solo", t.TempDir(), 0)
+			if err != nil {
+				t.Fatal(err)
+			}
+			if got := strings.Join(fileNames(files), ","); got != "Song_solo.mp3" {
+				t.Fatalf("files = %s", got)
+			}
+			calls := fakeCalls(t, fake)
+			if len(calls) != 2 || callsWith(calls, "cdn.fake.test") != 0 {
+				t.Errorf("calls = %q, want one listing and one download of the input URL", calls)
+			}
+		})
+	}
+}
+
+func TestRunYtdlpStagesSharesOnlyRateLimitStage(t *testing.T) {
+	fake := useFakeYtdlp(t, 1, nil, nil)
+	os.WriteFile(filepath.Join(fake, "blocked_b"), nil, 0644)
+	os.WriteFile(filepath.Join(fake, "cookies_c"), nil, 0644)
+	args := []string{"--output", filepath.Join(t.TempDir(), "%(title)s.%(ext)s"), "--no-playlist"}
+	entry := func(id string) []playlistEntry {
+		return []playlistEntry{{ID: id, URL: "https://fake.test/watch/" + id}}
+	}
+
+	// Output that gets no video through does not escalate anyone.
+	var stage atomic.Int32
+	if _, err := runYtdlpStages(args, entry("b"), &stage); err == nil {
+		t.Fatal("b: want an error")
+	}
+	if got := stage.Load(); got != 0 {
+		t.Fatalf("shared stage = %d after a batch that got nothing through, want 0", got)
+	}
+
+	// A video that needed cookies raises the shared stage to slow, not to
+	// the cookie stage it got through at.
+	if out, err := runYtdlpStages(args, entry("c"), &stage); err != nil || !strings.HasPrefix(string(out), "c\t") {
+		t.Fatalf("c: out %q, err %v", out, err)
+	}
+	if got := stage.Load(); got != 1 {
+		t.Fatalf("shared stage = %d after c needed chrome cookies, want 1 (slow)", got)
+	}
+	fakeCalls(t, fake)
+
+	// The next batch starts with request delays and without cookies.
+	if _, err := runYtdlpStages(args, entry("d"), &stage); err != nil {
+		t.Fatal(err)
+	}
+	calls := fakeCalls(t, fake)
+	if len(calls) != 1 || callsWith(calls, "--sleep-requests") != 1 || callsWith(calls, "--cookies-from-browser") != 0 {
+		t.Errorf("calls = %q, want one slow-stage call without cookies", calls)
+	}
+}
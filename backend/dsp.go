@@ -203,6 +203,10 @@ func estimateBeatTimes(onset []float64, sr int, duration, bpm float64, hopSize i
 
 // --- Energy ---
 
+// computeRMSFrames returns the RMS of each frameSize window, advancing by
+// hopSize. Frames overlap (2048/512 puts every sample in four frames), so when
+// frameSize is a whole number of hops the squares are summed once per hop
+// block and each frame adds up its blocks instead of re-squaring samples.
 func computeRMSFrames(samples []float32, frameSize, hopSize int) []float64 {
 	n := len(samples)
 	numFrames := (n - frameSize) / hopSize
@@ -210,6 +214,26 @@ func computeRMSFrames(samples []float32, frameSize, hopSize int) []float64 {
 		return []float64{0.5}
 	}
 	rms := make([]float64, numFrames)
+	if frameSize%hopSize == 0 {
+		blocksPerFrame := frameSize / hopSize
+		blocks := make([]float64, numFrames-1+blocksPerFrame)
+		for b := range blocks {
+			sum := 0.0
+			for _, s := range samples[b*hopSize : (b+1)*hopSize] {
+				v := float64(s)
+				sum += v * v
+			}
+			blocks[b] = sum
+		}
+		for i := range rms {
+			sum := 0.0
+			for _, bs := range blocks[i : i+blocksPerFrame] {
+				sum += bs
+			}
+			rms[i] = math.Sqrt(sum / float64(frameSize))
+		}
+		return rms
+	}
 	for i := 0; i < numFrames; i++ {
 		start := i * hopSize
 		sum := 0.0
@@ -227,12 +251,13 @@ func computeRMSFrames(samples []float32, frameSize, hopSize int) []float64 {
 }
 
 func computeBeatEnergy(samples []float32, sr int, beatTimes []float64) []float64 {
-	frameSize := 2048
-	hopSize := 512
-	rms := computeRMSFrames(samples, frameSize, hopSize)
+	// Degenerate beat grids take the flat fallback before any RMS work.
 	if len(beatTimes) < 2 {
 		return []float64{0.5}
 	}
+	frameSize := 2048
+	hopSize := 512
+	rms := computeRMSFrames(samples, frameSize, hopSize)
 
 	energy := make([]float64, len(beatTimes))
 	for i, bt := range beatTimes {
@@ -434,31 +459,49 @@ func detectHighlights(beatTimes []float64, energy []float64) []Highlight {
 		}
 		return []Highlight{{StartTime: 0, EndTime: end, Score: 0}}
 	}
-	var candidates []Highlight
-	for i := 0; i+windowSize <= len(energy); i += 16 {
+	// Windows advance by 16 beats, so every beat falls in four of them: sum
+	// each 16-beat block once and add up a window's blocks.
+	const hop = 16
+	blocks := make([]float64, len(energy)/hop)
+	for b := range blocks {
+		for _, e := range energy[b*hop : (b+1)*hop] {
+			blocks[b] += e
+		}
+	}
+	// Only the three best windows are kept, so each is inserted into a
+	// three-slot list as it is scored instead of collecting and sorting them
+	// all. Ties keep the earlier window.
+	const keep = 3
+	top := make([]Highlight, 0, keep)
+	for i := 0; i+windowSize <= len(energy); i += hop {
 		sum := 0.0
-		for j := i; j < i+windowSize; j++ {
-			sum += energy[j]
+		for _, bs := range blocks[i/hop : (i+windowSize)/hop] {
+			sum += bs
 		}
 		avg := sum / float64(windowSize)
+		if len(top) == keep && avg <= top[keep-1].Score {
+			continue
+		}
 		endIdx := i + windowSize - 1
 		if endIdx >= len(beatTimes) {
 			endIdx = len(beatTimes) - 1
 		}
-		candidates = append(candidates, Highlight{
+		h := Highlight{
 			StartBeatIdx: i, EndBeatIdx: i + windowSize,
 			StartTime: beatTimes[i], EndTime: beatTimes[endIdx],
 			Score: avg,
-		})
-	}
-	// Sort descending by score using standard library
-	sort.Slice(candidates, func(i, j int) bool {
-		return candidates[i].Score > candidates[j].Score
-	})
-	if len(candidates) > 3 {
-		candidates = candidates[:3]
+		}
+		pos := len(top)
+		for pos > 0 && top[pos-1].Score < avg {
+			pos--
+		}
+		if len(top) < keep {
+			top = append(top, Highlight{})
+		}
+		copy(top[pos+1:], top[pos:])
+		top[pos] = h
 	}
-	return candidates
+	return top
 }
 
 func sortFloat64s(a []float64) {
@@ -13,6 +13,7 @@ import (
 	"path/filepath"
 	"strings"
 	"syscall"
+	"time"
 )
 
 var cacheDir = "cache"
@@ -60,6 +61,9 @@ func main() {
 
 	// Ensure directories
 	os.MkdirAll(cacheDir, 0755)
+	// Conversions still running elsewhere finish well within the hour;
+	// older temp WAVs were abandoned by a crash or a killed worker.
+	sweepNormTemps(cacheDir, time.Hour)
 	os.MkdirAll(uploadsDir, 0755)
 	os.MkdirAll(outputDir, 0755)
 
@@ -106,6 +110,10 @@ func main() {
 	}
 }
 
+// uploadNameReplacer sanitizes uploaded file names; built once rather than
+// per file.
+var uploadNameReplacer = strings.NewReplacer("..", "_")
+
 // handleUpload accepts multipart file uploads and saves them to uploadsDir.
 // Returns JSON: {"files": [{"path": "...", "filename": "..."}]}
 func handleUpload(w http.ResponseWriter, r *http.Request) {
@@ -129,8 +137,7 @@ func handleUpload(w http.ResponseWriter, r *http.Request) {
 			defer src.Close()
 
 			// Sanitize filename
-			name := filepath.Base(fh.Filename)
-			name = strings.ReplaceAll(name, "..", "_")
+			name := uploadNameReplacer.Replace(filepath.Base(fh.Filename))
 			dst := filepath.Join(uploadsDir, name)
 
 			out, err := os.Create(dst)
@@ -160,6 +167,20 @@ func handlePlan(w http.ResponseWriter, r *http.Request) {
 		req.Scenarios = 5
 	}
 	plan := GenerateMixPlan(req.Tracks, req.TypeWeights, req.BarWeights, req.Scenarios)
+
+	// A plan is what gets rendered next; normalize exactly its tracks while
+	// the user reviews it, so the mix render finds them cached.
+	var planned []string
+	seen := make(map[string]bool, len(plan.SortedTracks))
+	for _, t := range plan.SortedTracks {
+		if t.Filepath != "" && !seen[t.Filepath] {
+			seen[t.Filepath] = true
+			planned = append(planned, t.Filepath)
+		}
+	}
+	absCache, _ := filepath.Abs(cacheDir)
+	PrewarmNormWavs(planned, absCache)
+
 	w.Header().Set("Content-Type", "application/json")
 	json.NewEncoder(w).Encode(PlanResponse{Plan: plan})
 }
@@ -3,7 +3,9 @@ package main
 import (
 	"math"
 	"math/rand"
+	"runtime"
 	"sort"
+	"sync"
 )
 
 // ComputePlayBounds sets PlayStart / PlayEnd on each TrackEntry.
@@ -43,14 +45,7 @@ func ComputePlayBounds(playlist []TrackWithAnalysis, transitions []TransitionSpe
 		}
 		// Snap to nearest beat
 		if len(beats) > 0 && anchor > 0 {
-			best, bestD := 0, math.Abs(beats[0]-anchor)
-			for i, b := range beats {
-				if d := math.Abs(b - anchor); d < bestD {
-					bestD = d
-					best = i
-				}
-			}
-			anchor = beats[best]
+			anchor = beats[nearestIndex(beats, anchor)]
 		}
 		if anchor > dur*0.5 {
 			anchor = 0 // fallback: play from beginning if analysis misidentified
@@ -107,6 +102,9 @@ func GenerateMixPlan(tracks []TrackAnalysis, typeWeights map[string]float64, bar
 	if barWeights == nil {
 		barWeights = map[int]float64{4: 1.0, 8: 1.3}
 	}
+	// The weighted bar table depends only on barWeights, so it is expanded
+	// once here and shared read-only by every scenario and pair.
+	bars := weightedIntKeys(barWeights)
 
 	bestScore := math.Inf(-1)
 	var bestSelections []TransitionSpec
@@ -116,27 +114,57 @@ func GenerateMixPlan(tracks []TrackAnalysis, typeWeights map[string]float64, bar
 		numScenarios = 5
 	}
 
+	// Scenarios are independent, so they run concurrently. Each gets its own
+	// *rand.Rand, which also avoids the global source's lock on the several
+	// draws per candidate. Seeds are drawn from the global source up front
+	// and in order, so plans stay reproducible under rand.Seed, and the
+	// winner is picked in scenario order exactly as the sequential loop did.
+	type scenario struct {
+		score float64
+		cands [][]TransitionSpec
+		sels  []TransitionSpec
+	}
+	seeds := make([]int64, numScenarios)
+	for s := range seeds {
+		seeds[s] = rand.Int63()
+	}
+	scenarios := make([]scenario, numScenarios)
+
+	concurrency := runtime.NumCPU()
+	if concurrency > numScenarios {
+		concurrency = numScenarios
+	}
+	var wg sync.WaitGroup
+	sem := make(chan struct{}, concurrency)
 	for s := 0; s < numScenarios; s++ {
-		scenarioScore := 0.0
-		var scenarioCands [][]TransitionSpec
-		var scenarioSels []TransitionSpec
-		minExitTime := 0.0
-
-		for i := 0; i < len(sorted)-1; i++ {
-			cands := generateCandidates(sorted[i], sorted[i+1], typeWeights, barWeights, 8)
-			best := selectBest(cands, typeWeights, barWeights, minExitTime)
-			if best != nil {
-				scenarioScore += typeWeights[best.Type]
-				scenarioSels = append(scenarioSels, *best)
-				minExitTime = best.BInTime
+		wg.Add(1)
+		go func(s int) {
+			defer wg.Done()
+			sem <- struct{}{}
+			defer func() { <-sem }()
+
+			rng := rand.New(rand.NewSource(seeds[s]))
+			sc := &scenarios[s]
+			minExitTime := 0.0
+			for i := 0; i < len(sorted)-1; i++ {
+				cands := generateCandidates(rng, sorted[i], sorted[i+1], typeWeights, bars, 8)
+				best := selectBest(rng, cands, typeWeights, barWeights, minExitTime)
+				if best != nil {
+					sc.score += typeWeights[best.Type]
+					sc.sels = append(sc.sels, *best)
+					minExitTime = best.BInTime
+				}
+				sc.cands = append(sc.cands, cands)
 			}
-			scenarioCands = append(scenarioCands, cands)
-		}
+		}(s)
+	}
+	wg.Wait()
 
-		if scenarioScore > bestScore {
-			bestScore = scenarioScore
-			bestSelections = scenarioSels
-			bestCandidates = scenarioCands
+	for _, sc := range scenarios {
+		if sc.score > bestScore {
+			bestScore = sc.score
+			bestSelections = sc.sels
+			bestCandidates = sc.cands
 		}
 	}
 
@@ -160,18 +188,24 @@ func sortPlaylist(tracks []TrackAnalysis) []TrackAnalysis {
 	}
 
 	// Precompute avgEnergy for every track once — avoids O(n² × energy_len)
-	// repeated scans inside the greedy nearest-neighbour loop below.
-	preEnergy := make(map[string]float64, len(tracks))
-	for _, t := range tracks {
-		preEnergy[t.Filepath] = avgEnergy(t)
+	// repeated scans inside the greedy nearest-neighbour loop below. Tracks
+	// are handled by index throughout, so scoring reads energy from a slice
+	// rather than hashing the file path, and removing a pick shifts ints
+	// instead of whole TrackAnalysis values.
+	preEnergy := make([]float64, len(tracks))
+	for i := range tracks {
+		preEnergy[i] = avgEnergy(tracks[i])
 	}
 
-	sorted := []TrackAnalysis{tracks[0]}
-	remaining := make([]TrackAnalysis, len(tracks)-1)
-	copy(remaining, tracks[1:])
+	sorted := make([]TrackAnalysis, 1, len(tracks))
+	sorted[0] = tracks[0]
+	remaining := make([]int, len(tracks)-1)
+	for i := range remaining {
+		remaining[i] = i + 1
+	}
 
 	for len(remaining) > 0 {
-		current := sorted[len(sorted)-1]
+		current := &sorted[len(sorted)-1]
 		bestIdx := 0
 		bestScore := math.Inf(-1)
 
@@ -179,7 +213,8 @@ func sortPlaylist(tracks []TrackAnalysis) []TrackAnalysis {
 		position := float64(len(sorted)) / float64(len(tracks))
 		targetEnergy := idealEnergy(position)
 
-		for i, t := range remaining {
+		for i, ti := range remaining {
+			t := &tracks[ti]
 			score := 0.0
 			keyDist := camelotDistance(current.Key, t.Key)
 			// Perfect match = 0, relative = 10, completely off = 60+ penalty
@@ -189,7 +224,7 @@ func sortPlaylist(tracks []TrackAnalysis) []TrackAnalysis {
 			score += math.Max(0, 20-bpmDiff)
 
 			// ── Phase 3 (C-2): Energy Arc penalty ──
-			tE := preEnergy[t.Filepath]
+			tE := preEnergy[ti]
 			energyPenalty := math.Abs(tE - targetEnergy)
 			// Base score for energy is max 20
 			score += math.Max(0, 20-energyPenalty*20)
@@ -210,7 +245,7 @@ func sortPlaylist(tracks []TrackAnalysis) []TrackAnalysis {
 				bestIdx = i
 			}
 		}
-		sorted = append(sorted, remaining[bestIdx])
+		sorted = append(sorted, tracks[remaining[bestIdx]])
 		remaining = append(remaining[:bestIdx], remaining[bestIdx+1:]...)
 	}
 	return sorted
@@ -227,28 +262,22 @@ func avgEnergy(t TrackAnalysis) float64 {
 	return sum / float64(len(t.Energy))
 }
 
-var noteOrder = []string{"C", "C#", "D", "D#", "E", "F", "F#", "G", "G#", "A", "A#", "B"}
+// noteIdx maps a root note to its chromatic index, replacing a scan of the
+// 12-note list on every key comparison.
+var noteIdx = map[string]int{
+	"C": 0, "C#": 1, "D": 2, "D#": 3, "E": 4, "F": 5,
+	"F#": 6, "G": 7, "G#": 8, "A": 9, "A#": 10, "B": 11,
+}
 
 func noteIndex(key string) int {
 	if len(key) < 1 {
 		return 0
 	}
-	root := key
-	if len(key) > 2 && key[1] == '#' {
+	root := key[:1]
+	if len(key) > 1 && key[1] == '#' {
 		root = key[:2]
-	} else {
-		root = key[:1]
-		// handle "C#" correctly: check if second char is '#'
-		if len(key) > 1 && key[1] == '#' {
-			root = key[:2]
-		}
 	}
-	for i, n := range noteOrder {
-		if n == root {
-			return i
-		}
-	}
-	return 0
+	return noteIdx[root] // unknown roots map to 0, as before
 }
 
 func keyDistance(k1, k2 string) int {
@@ -301,54 +330,64 @@ func camelotDistance(k1, k2 string) int {
 	}
 }
 
-func selectTransitionType(ta, tb TrackAnalysis, typeW map[string]float64) string {
+// typeChoice is one eligible transition type and its base weight.
+type typeChoice struct {
+	name   string
+	weight float64
+}
+
+// transitionChoices returns the transition types eligible for the pair and
+// their base weights, as a small fixed-order table. It depends only on the
+// two tracks, so it is computed once per pair rather than once per candidate,
+// and drawing from it walks a flat slice instead of a map iterator.
+func transitionChoices(ta, tb TrackAnalysis, typeW map[string]float64) []typeChoice {
 	energyDiff := avgEnergy(tb) - avgEnergy(ta)
 	keyDist := camelotDistance(ta.Key, tb.Key)
 	bpmDiff := math.Abs(ta.BPM - tb.BPM)
 
-	choices := make(map[string]float64)
+	choices := make([]typeChoice, 0, 3)
 	if val, ok := typeW["crossfade"]; ok {
-		choices["crossfade"] = val
+		choices = append(choices, typeChoice{"crossfade", val})
 	} else {
-		choices["crossfade"] = 0.5
+		choices = append(choices, typeChoice{"crossfade", 0.5})
+	}
+	add := func(name string) {
+		if val, ok := typeW[name]; ok {
+			choices = append(choices, typeChoice{name, val})
+		}
 	}
 
 	if keyDist <= 10 && bpmDiff < 5.0 {
-		if val, ok := typeW["mashup"]; ok {
-			choices["mashup"] = val
-		}
-		if val, ok := typeW["bass_swap"]; ok {
-			choices["bass_swap"] = val
-		}
+		add("mashup")
+		add("bass_swap")
 	} else if energyDiff > 0.2 {
-		if val, ok := typeW["bass_swap"]; ok {
-			choices["bass_swap"] = val
-		}
+		add("bass_swap")
 	} else if energyDiff < -0.2 {
-		if val, ok := typeW["filter_fade"]; ok {
-			choices["filter_fade"] = val
-		}
+		add("filter_fade")
 	} else if bpmDiff > 10.0 {
-		if val, ok := typeW["cut"]; ok {
-			choices["cut"] = val
-		}
+		add("cut")
 	}
 
+	return choices
+}
+
+// selectTransitionType draws a transition type from the pair's choices.
+func selectTransitionType(rng *rand.Rand, choices []typeChoice) string {
 	bestType := "crossfade"
 	bestScore := math.Inf(-1)
-	for t, w := range choices {
-		score := w * (0.5 + rand.Float64()) // random variance
+	for _, c := range choices {
+		score := c.weight * (0.5 + rng.Float64()) // random variance
 		if score > bestScore {
 			bestScore = score
-			bestType = t
+			bestType = c.name
 		}
 	}
 	return bestType
 }
 
-func generateCandidates(ta, tb TrackAnalysis, typeW map[string]float64, barW map[int]float64, count int) []TransitionSpec {
-	bars := weightedIntKeys(barW)
-
+// generateCandidates draws count candidate transitions from ta into tb. bars
+// is the weighted bar-length table from weightedIntKeys.
+func generateCandidates(rng *rand.Rand, ta, tb TrackAnalysis, typeW map[string]float64, bars []int, count int) []TransitionSpec {
 	durA := ta.Duration
 	durB := tb.Duration
 	bpmA := ta.BPM
@@ -370,59 +409,88 @@ func generateCandidates(ta, tb TrackAnalysis, typeW map[string]float64, barW map
 
 	beatTimesA := ta.BeatTimes
 	beatTimesB := tb.BeatTimes
-
-	var cands []TransitionSpec
+	exitPool := segmentPool(segsA, []string{"Chorus", "Verse", "Bridge", "Outro"})
+	entryPool := segmentPool(segsB, []string{"Intro", "Verse", "Chorus", "Bridge"})
+
+	// Loop invariants: the strongest highlight of each track and the beat
+	// length do not change between candidates.
+	var bestHA, bestHB Highlight
+	if len(ta.Highlights) > 0 {
+		bestHA = bestHighlight(ta.Highlights)
+	}
+	if len(tb.Highlights) > 0 {
+		bestHB = bestHighlight(tb.Highlights)
+	}
+	beatDur := 60.0 / targetBPM
+	typeChoices := transitionChoices(ta, tb, typeW)
+
+	// Every exit/entry point a candidate can use is a pool segment or the best
+	// highlight, so each is snapped and clamped once per pair and candidates
+	// just index the results. Pools are never empty: segsA/segsB always hold
+	// at least one segment and segmentPool falls back to all of them.
+	exitOut := snapTimes(exitPool, 20, ta.Phrases, beatTimesA, durA)
+	entryIn := snapTimes(entryPool, 0, tb.Phrases, beatTimesB, durB)
+	highlightOut := clampF(snapToPhrase(bestHA.EndTime+20, ta.Phrases, beatTimesA, 16), 0, durA)
+	highlightIn := clampF(snapToPhrase(bestHB.StartTime, tb.Phrases, beatTimesB, 16), 0, durB)
+	// Label flags stored alongside the pools, so the Outro->Intro test below
+	// is two indexed loads instead of string comparisons.
+	exitIsOutro := labelMask(exitPool, "Outro")
+	entryIsIntro := labelMask(entryPool, "Intro")
+	// When every exit is an Outro and every entry an Intro, re-drawing can
+	// only produce the same pairing, so the retry loop is skipped outright
+	// instead of spinning until its 5% escape draw.
+	canAvoidBoring := false
+	for _, outro := range exitIsOutro {
+		canAvoidBoring = canAvoidBoring || !outro
+	}
+	for _, intro := range entryIsIntro {
+		canAvoidBoring = canAvoidBoring || !intro
+	}
+
+	cands := make([]TransitionSpec, 0, count)
 	for i := 0; i < count; i++ {
 		// ── Phase 1 (D-1): Auto transition type selection ──
-		tType := selectTransitionType(ta, tb, typeW)
-		pickedBars := bars[rand.Intn(len(bars))]
+		tType := selectTransitionType(rng, typeChoices)
+		pickedBars := bars[rng.Intn(len(bars))]
 
-		var exitSeg Segment
-		var entrySeg Segment
+		var exitSeg, entrySeg Segment
+		var aOut, bIn float64
+		var exitIdx, entryIdx int
+		exitBoring, entryBoring := false, false
 
 		// ── Phase 3 (E-2): Utilize highlights if available ──
-		if len(ta.Highlights) > 0 && rand.Float64() > 0.3 {
-			bestH := ta.Highlights[0]
-			for _, h := range ta.Highlights {
-				if h.Score > bestH.Score {
-					bestH = h
-				}
-			}
-			exitSeg = Segment{Time: bestH.EndTime, Label: "Highlight"}
+		if len(ta.Highlights) > 0 && rng.Float64() > 0.3 {
+			exitSeg = Segment{Time: bestHA.EndTime, Label: "Highlight"}
+			aOut = highlightOut
 		} else {
-			exitSeg = pickSegment(segsA, []string{"Chorus", "Verse", "Bridge", "Outro"})
+			exitIdx = rng.Intn(len(exitPool))
+			exitSeg, aOut, exitBoring = exitPool[exitIdx], exitOut[exitIdx], exitIsOutro[exitIdx]
 		}
 
-		if len(tb.Highlights) > 0 && rand.Float64() > 0.3 {
-			bestH := tb.Highlights[0]
-			for _, h := range tb.Highlights {
-				if h.Score > bestH.Score {
-					bestH = h
-				}
-			}
-			entrySeg = Segment{Time: bestH.StartTime, Label: "Highlight"}
+		if len(tb.Highlights) > 0 && rng.Float64() > 0.3 {
+			entrySeg = Segment{Time: bestHB.StartTime, Label: "Highlight"}
+			bIn = highlightIn
 		} else {
-			entrySeg = pickSegment(segsB, []string{"Intro", "Verse", "Chorus", "Bridge"})
+			entryIdx = rng.Intn(len(entryPool))
+			entrySeg, bIn, entryBoring = entryPool[entryIdx], entryIn[entryIdx], entryIsIntro[entryIdx]
 		}
 
 		// Avoid boring Outro->Intro
-		for exitSeg.Label == "Outro" && entrySeg.Label == "Intro" && rand.Float64() > 0.05 {
-			exitSeg = pickSegment(segsA, []string{"Chorus", "Verse", "Bridge", "Outro"})
-			entrySeg = pickSegment(segsB, []string{"Intro", "Verse", "Chorus", "Bridge"})
+		for canAvoidBoring && exitBoring && entryBoring && rng.Float64() > 0.05 {
+			exitIdx = rng.Intn(len(exitPool))
+			entryIdx = rng.Intn(len(entryPool))
+			exitSeg, aOut, exitBoring = exitPool[exitIdx], exitOut[exitIdx], exitIsOutro[exitIdx]
+			entrySeg, bIn, entryBoring = entryPool[entryIdx], entryIn[entryIdx], entryIsIntro[entryIdx]
 		}
 
-		aOut := snapToPhrase(exitSeg.Time+20, ta.Phrases, beatTimesA, 16)
-		bIn := snapToPhrase(entrySeg.Time, tb.Phrases, beatTimesB, 16)
-
-		beatDur := 60.0 / targetBPM
 		dur := float64(pickedBars) * 4 * beatDur
 
 		cands = append(cands, TransitionSpec{
 			Type:     tType,
 			Name:     tType + " | " + exitSeg.Label + "->" + entrySeg.Label,
 			Duration: dur,
-			AOutTime: clampF(aOut, 0, durA),
-			BInTime:  clampF(bIn, 0, durB),
+			AOutTime: aOut,
+			BInTime:  bIn,
 			SpeedA:   speedA,
 			SpeedB:   speedB,
 		})
@@ -430,33 +498,52 @@ func generateCandidates(ta, tb TrackAnalysis, typeW map[string]float64, barW map
 	return cands
 }
 
-func selectBest(cands []TransitionSpec, typeW map[string]float64, barW map[int]float64, minExit float64) *TransitionSpec {
+// bestHighlight returns the highest-scoring highlight, the first on a tie.
+func bestHighlight(hs []Highlight) Highlight {
+	best := hs[0]
+	for _, h := range hs[1:] {
+		if h.Score > best.Score {
+			best = h
+		}
+	}
+	return best
+}
+
+func selectBest(rng *rand.Rand, cands []TransitionSpec, typeW map[string]float64, barW map[int]float64, minExit float64) *TransitionSpec {
 	if len(cands) == 0 {
 		return nil
 	}
-	type scored struct {
-		s float64
-		c TransitionSpec
-	}
-	var list []scored
-	for _, c := range cands {
+	// Single pass keeping the running maximum: only the winner is needed, so
+	// there is nothing to sort. Candidates are read by index — each
+	// TransitionSpec is nine fields wide — and only the winner is copied.
+	// Exits earlier than 4s past the previous entry are penalized; the
+	// threshold is fixed for the whole candidate set.
+	safeExit := minExit + 4
+	bestIdx, bestScore := 0, math.Inf(-1)
+	for i := range cands {
+		c := &cands[i]
 		w := typeW[c.Type]
 		if w == 0 {
 			w = 1.0
 		}
-		penalty := 0.0
-		if c.AOutTime < minExit+4 {
-			penalty = -500
+		score := w + rng.Float64()*0.01
+		if c.AOutTime < safeExit {
+			score -= 500
+		}
+		if score > bestScore {
+			bestIdx, bestScore = i, score
 		}
-		score := w + penalty + rand.Float64()*0.01
-		list = append(list, scored{score, c})
 	}
-	sort.Slice(list, func(i, j int) bool { return list[i].s > list[j].s })
-	best := list[0].c
+	best := cands[bestIdx]
 	return &best
 }
 
-func pickSegment(segs []Segment, labels []string) Segment {
+// segmentPool returns the segments a candidate's exit or entry is drawn from:
+// those carrying one of labels without heavy vocals, else those carrying one
+// of labels, else all of segs. It depends only on the track, so
+// generateCandidates builds each pool once per pair and every draw is a
+// single Intn.
+func segmentPool(segs []Segment, labels []string) []Segment {
 	var pool []Segment
 	for _, s := range segs {
 		// ── Phase 2 (B-3): Avoid heavy vocals during entry/exit ──
@@ -481,27 +568,36 @@ func pickSegment(segs []Segment, labels []string) Segment {
 			}
 		}
 	}
+	if len(pool) == 0 {
+		return segs
+	}
+	return pool
+}
 
-	if len(pool) == 0 && len(segs) > 0 {
-		return segs[rand.Intn(len(segs))]
+// labelMask reports, per pool entry, whether its label is label.
+func labelMask(pool []Segment, label string) []bool {
+	mask := make([]bool, len(pool))
+	for k, seg := range pool {
+		mask[k] = seg.Label == label
 	}
-	if len(pool) == 0 {
-		return Segment{Time: 0, Label: "Verse", Energy: 0.5}
+	return mask
+}
+
+// snapTimes snaps each segment's time plus offset to the phrase/beat grid
+// and clamps it to the track, in pool order.
+func snapTimes(pool []Segment, offset float64, phrases, beats []float64, dur float64) []float64 {
+	out := make([]float64, len(pool))
+	for k, seg := range pool {
+		out[k] = clampF(snapToPhrase(seg.Time+offset, phrases, beats, 16), 0, dur)
 	}
-	return pool[rand.Intn(len(pool))]
+	return out
 }
 
 func snapToPhrase(timeSec float64, phrases []float64, beats []float64, grid int) float64 {
 	if len(phrases) > 0 {
-		best, bestD := phrases[0], math.Abs(phrases[0]-timeSec)
-		for _, p := range phrases[1:] {
-			if d := math.Abs(p - timeSec); d < bestD {
-				bestD = d
-				best = p
-			}
-		}
+		best := phrases[nearestIndex(phrases, timeSec)]
 		// Snapping is acceptable if the closest phrase boundary is within ~15 seconds.
-		if bestD < 15.0 {
+		if math.Abs(best-timeSec) < 15.0 {
 			return best
 		}
 	}
@@ -512,24 +608,26 @@ func snapGrid(timeSec float64, beats []float64, grid int) float64 {
 	if len(beats) == 0 {
 		return timeSec
 	}
-	best, bestD := 0, math.Abs(beats[0]-timeSec)
-	for i, b := range beats {
-		if d := math.Abs(b - timeSec); d < bestD {
-			bestD = d
-			best = i
-		}
-	}
+	best := nearestIndex(beats, timeSec)
 	snapped := int(math.Round(float64(best)/float64(grid))) * grid
 	if snapped >= len(beats) {
 		snapped = (len(beats) - 1) / grid * grid
 	}
-	if snapped < 0 {
-		snapped = 0
+	return beats[snapped]
+}
+
+// nearestIndex returns the index of the value in xs closest to x, preferring
+// the earlier one on a tie. xs must be sorted ascending (beat and phrase
+// times are), which turns the linear scan into a binary search.
+func nearestIndex(xs []float64, x float64) int {
+	i := sort.SearchFloat64s(xs, x)
+	if i == len(xs) {
+		return len(xs) - 1
 	}
-	if snapped >= len(beats) {
-		snapped = len(beats) - 1
+	if i > 0 && x-xs[i-1] <= xs[i]-x {
+		return i - 1
 	}
-	return beats[snapped]
+	return i
 }
 
 func clampF(v, lo, hi float64) float64 {
@@ -542,26 +640,19 @@ func clampF(v, lo, hi float64) float64 {
 	return v
 }
 
-func weightedKeys(m map[string]float64) []string {
-	var keys []string
-	for k, w := range m {
-		n := int(math.Round(w * 10))
-		if n < 1 {
-			n = 1
-		}
-		for i := 0; i < n; i++ {
-			keys = append(keys, k)
-		}
-	}
-	if len(keys) == 0 {
-		return []string{"crossfade"}
-	}
-	return keys
-}
-
+// weightedIntKeys expands m into a table in which each key appears in
+// proportion to its weight, so a uniform index draw is a weighted draw. Keys
+// are laid out in ascending order, so the same seed always draws the same
+// bars regardless of map iteration order.
 func weightedIntKeys(m map[int]float64) []int {
+	order := make([]int, 0, len(m))
+	for k := range m {
+		order = append(order, k)
+	}
+	sort.Ints(order)
 	var keys []int
-	for k, w := range m {
+	for _, k := range order {
+		w := m[k]
 		n := int(math.Round(w * 10))
 		if n < 1 {
 			n = 1
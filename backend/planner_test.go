@@ -0,0 +1,54 @@
+package main
+
+import (
+	"fmt"
+	"math/rand"
+	"reflect"
+	"testing"
+)
+
+func plannerTestTracks(n int) []TrackAnalysis {
+	rng := rand.New(rand.NewSource(1))
+	tracks := make([]TrackAnalysis, n)
+	for i := range tracks {
+		bpm := 90.0 + rng.Float64()*60.0
+		dur := 160.0 + rng.Float64()*80.0
+		var beats, energy []float64
+		for cur := 0.0; cur < dur; cur += 60.0 / bpm {
+			beats = append(beats, cur)
+			energy = append(energy, 0.4+rng.Float64()*0.5)
+		}
+		tracks[i] = TrackAnalysis{
+			Filepath:  fmt.Sprintf("track_%d", i),
+			Duration:  dur,
+			BPM:       bpm,
+			BeatTimes: beats,
+			Energy:    energy,
+			Segments: []Segment{
+				{Time: 0, Label: "Intro", Energy: 0.4},
+				{Time: dur * 0.25, Label: "Verse", Energy: 0.6},
+				{Time: dur * 0.5, Label: "Chorus", Energy: 0.9},
+				{Time: dur - 30, Label: "Outro", Energy: 0.3},
+			},
+		}
+	}
+	return tracks
+}
+
+// Scenarios run concurrently, but each draws from its own seeded source, so
+// the same rand.Seed must give the same plan however they are scheduled.
+// Run with -race to also check the scenarios share no mutable state.
+func TestGenerateMixPlanConcurrentScenariosDeterministic(t *testing.T) {
+	tracks := plannerTestTracks(8)
+	rand.Seed(7)
+	want := GenerateMixPlan(tracks, nil, nil, 12)
+	if len(want.Selections) != len(tracks)-1 {
+		t.Fatalf("%d selections for %d tracks", len(want.Selections), len(tracks))
+	}
+	for run := 0; run < 5; run++ {
+		rand.Seed(7)
+		if got := GenerateMixPlan(tracks, nil, nil, 12); !reflect.DeepEqual(got, want) {
+			t.Fatalf("run %d: plan differs under the same seed", run)
+		}
+	}
+}
@@ -2,15 +2,21 @@ package main
 
 import (
 	"bytes"
+	"crypto/md5"
 	"encoding/binary"
 	"fmt"
+	"io"
 	"log"
 	"math"
 	"os"
 	"os/exec"
 	"path/filepath"
+	"runtime"
+	"sort"
+	"strconv"
 	"strings"
 	"sync"
+	"time"
 
 	"crypto/rand"
 )
@@ -45,6 +51,10 @@ func clampPlayBounds(startSec, endSec, duration float64) (float64, float64) {
 	return startSec, endSec
 }
 
+// silenceThreshSq is -40 dBFS expressed as a squared int16 amplitude, so the
+// trailing-silence scan can compare raw energy sums without a sqrt/log10.
+const silenceThreshSq = (0.01 * 32768.0) * (0.01 * 32768.0)
+
 // trimSilenceEnd scans backward from the end of a normalized WAV file and
 // returns the effective duration (seconds) by skipping trailing silence below
 // -40 dBFS.  Uses ReadAt for seek-based access — no full-file read (~17 KB
@@ -67,9 +77,9 @@ func trimSilenceEnd(wavPath string) float64 {
 
 	// WAV: 44-byte header, then interleaved 16-bit stereo samples at 44100 Hz.
 	dataBytes := fileSize - 44
-	totalSamples := dataBytes / 2    // one int16 = 2 bytes
-	chunkSamples := int64(4410 * 2)  // 100 ms × 2 channels = 8820 samples
-	chunkBytes := chunkSamples * 2   // 17640 bytes per iteration
+	totalSamples := dataBytes / 2   // one int16 = 2 bytes
+	chunkSamples := int64(4410 * 2) // 100 ms × 2 channels = 8820 samples
+	chunkBytes := chunkSamples * 2  // 17640 bytes per iteration
 	buf := make([]byte, chunkBytes)
 
 	effSamples := totalSamples
@@ -79,13 +89,12 @@ func trimSilenceEnd(wavPath string) float64 {
 			break
 		}
 		count := n / 2
-		var sumSq float64
+		var sumSq int64
 		for k := 0; k < count; k++ {
-			v := float64(int16(binary.LittleEndian.Uint16(buf[k*2:k*2+2]))) / 32768.0
+			v := int64(int16(binary.LittleEndian.Uint16(buf[k*2:])))
 			sumSq += v * v
 		}
-		rms := math.Sqrt(sumSq / float64(count))
-		if 20.0*math.Log10(rms+1e-9) > -40.0 {
+		if float64(sumSq) > silenceThreshSq*float64(count) {
 			effSamples = j + chunkSamples
 			break
 		}
@@ -93,6 +102,323 @@ func trimSilenceEnd(wavPath string) float64 {
 	return float64(effSamples) / (44100.0 * 2.0)
 }
 
+// normWavPath returns where the loudness-normalized WAV for src is cached.
+// The key covers path, size and mtime, so re-renders of the same playlist
+// reuse the WAV while an edited or replaced source gets a fresh one.
+func normWavPath(cacheDir, src string) (string, error) {
+	info, err := os.Stat(src)
+	if err != nil {
+		return "", err
+	}
+	sum := md5.Sum([]byte(fmt.Sprintf("%s|%d|%d", src, info.Size(), info.ModTime().UnixNano())))
+	return filepath.Join(cacheDir, fmt.Sprintf("norm_%x.wav", sum[:8])), nil
+}
+
+// normWavEnds remembers the trimmed play end of every normalized WAV this
+// process has already validated, keyed by its normWavPath (which already
+// encodes the source's size and mtime). Re-rendering the same tracks then
+// skips the trailing-silence scan; only the WAV's existence is re-checked.
+var (
+	normWavMu   sync.Mutex
+	normWavEnds = map[string]float64{}
+)
+
+// forgetNormWavs drops the in-memory index; called when the WAVs are deleted.
+func forgetNormWavs() {
+	normWavMu.Lock()
+	normWavEnds = map[string]float64{}
+	normWavMu.Unlock()
+}
+
+// normJob is one source file whose loudness-normalized WAV is not cached yet.
+type normJob struct {
+	src     string
+	wavPath string
+}
+
+// normalizeToWAV converts every job's source to a loudness-normalized
+// 44.1 kHz stereo WAV with a single ffmpeg process (one -i per source, one
+// -map'd output per job), so process start-up and codec init are paid once
+// per batch instead of once per track. Outputs are encoded to unique temp
+// names and renamed into place, so a concurrent render never reads a
+// half-written cache entry.
+func normalizeToWAV(jobs []normJob) error {
+	args := []string{"-y", "-nostdin", "-hide_banner", "-loglevel", "error"}
+	for _, job := range jobs {
+		args = append(args, "-i", job.src)
+	}
+	tmpPaths := make([]string, len(jobs))
+	for k, job := range jobs {
+		tmpPaths[k] = job.wavPath + "." + randHex(4) + ".tmp"
+		args = append(args,
+			"-map", fmt.Sprintf("%d:a:0", k),
+			"-map_metadata", "-1",
+			"-ar", "44100", "-ac", "2", "-sample_fmt", "s16",
+			"-af", "loudnorm=I=-14:TP=-1.5:LRA=11",
+			"-f", "wav", tmpPaths[k],
+		)
+	}
+
+	var normStderr bytes.Buffer
+	cmd := exec.Command(ffmpegPath, args...)
+	hideWindow(cmd)
+	cmd.Stderr = &normStderr
+	if err := cmd.Run(); err != nil {
+		for _, tmp := range tmpPaths {
+			os.Remove(tmp)
+		}
+		return fmt.Errorf("%w\n%s", err, normStderr.String())
+	}
+	for k, job := range jobs {
+		if err := os.Rename(tmpPaths[k], job.wavPath); err != nil {
+			for _, tmp := range tmpPaths[k:] {
+				os.Remove(tmp)
+			}
+			return fmt.Errorf("failed to store wav [%s]: %w", filepath.Base(job.src), err)
+		}
+	}
+	return nil
+}
+
+// normResult is the outcome of preparing one source's normalized WAV.
+type normResult struct {
+	wavPath string
+	playEnd float64
+	ok      bool
+	known   bool // playEnd came from normWavEnds
+}
+
+// normWavInflight holds a channel per normalized WAV that some caller is
+// converting right now (guarded by normWavMu). It is closed when that
+// conversion ends, so a render arriving while analysis is pre-warming the
+// same tracks waits for the WAVs instead of converting them a second time.
+var normWavInflight = map[string]chan struct{}{}
+
+// prepareNormWavs makes sure every source (given without duplicates) has a
+// loudness-normalized WAV in cacheDir and returns, per source, its path and
+// trimmed play end. A source whose conversion failed has ok == false.
+func prepareNormWavs(sources []string, cacheDir string) []normResult {
+	// Cache hits are resolved up front; only the misses are handed to ffmpeg.
+	normResults := make([]normResult, len(sources))
+	var misses []normJob
+	var owned, awaited []chan struct{}
+	for idx, src := range sources {
+		wavPath, err := normWavPath(cacheDir, src)
+		if err != nil {
+			log.Printf("Warning: failed to stat source [%s]: %v", filepath.Base(src), err)
+			continue
+		}
+		normResults[idx].wavPath = wavPath
+		normWavMu.Lock()
+		playEnd, known := normWavEnds[wavPath]
+		busy, inflight := normWavInflight[wavPath]
+		normWavMu.Unlock()
+		if known {
+			// The remembered play end saves the silence scan, but the file
+			// itself may have been removed behind our back (user cleanup,
+			// antivirus, another instance), so it is still checked.
+			if info, err := os.Stat(wavPath); err == nil && info.Size() > 44 {
+				normResults[idx] = normResult{wavPath: wavPath, playEnd: playEnd, ok: true, known: true}
+				continue
+			}
+			normWavMu.Lock()
+			delete(normWavEnds, wavPath)
+			normWavMu.Unlock()
+		}
+		if inflight {
+			awaited = append(awaited, busy)
+			continue
+		}
+		if info, err := os.Stat(wavPath); err == nil && info.Size() > 44 {
+			log.Printf("[cache hit] normalized wav for %s", filepath.Base(src))
+			normResults[idx].ok = true
+			continue
+		}
+		normWavMu.Lock()
+		if busy, inflight := normWavInflight[wavPath]; inflight {
+			awaited = append(awaited, busy) // claimed since the check above
+			normWavMu.Unlock()
+			continue
+		}
+		done := make(chan struct{})
+		normWavInflight[wavPath] = done
+		normWavMu.Unlock()
+		owned = append(owned, done)
+		misses = append(misses, normJob{src: src, wavPath: wavPath})
+	}
+
+	// Misses are dealt round-robin into at most 4 batches, each converted by a
+	// single multi-input ffmpeg process. A batch that fails (e.g. one source
+	// without an audio stream) is retried file by file so one bad input does
+	// not cost the rest of the batch its normalization.
+	concurrency := runtime.NumCPU()
+	if concurrency > 4 {
+		concurrency = 4
+	}
+	if concurrency > len(misses) {
+		concurrency = len(misses)
+	}
+	batches := make([][]normJob, concurrency)
+	for k, job := range misses {
+		batches[k%concurrency] = append(batches[k%concurrency], job)
+	}
+	var normWg sync.WaitGroup
+	for _, batch := range batches {
+		normWg.Add(1)
+		go func(batch []normJob) {
+			defer normWg.Done()
+			if len(batch) > 1 {
+				err := normalizeToWAV(batch)
+				if err == nil {
+					return
+				}
+				log.Printf("Warning: batch wav conversion failed (%d files), retrying per file: %v", len(batch), err)
+			}
+			for _, job := range batch {
+				if info, err := os.Stat(job.wavPath); err == nil && info.Size() > 44 {
+					continue
+				}
+				if err := normalizeToWAV([]normJob{job}); err != nil {
+					log.Printf("Warning: failed to convert to wav [%s]: %v", filepath.Base(job.src), err)
+				}
+			}
+		}(batch)
+	}
+	normWg.Wait()
+
+	normWavMu.Lock()
+	for k, job := range misses {
+		delete(normWavInflight, job.wavPath)
+		close(owned[k])
+	}
+	normWavMu.Unlock()
+	for _, busy := range awaited {
+		<-busy
+	}
+
+	for idx := range normResults {
+		res := &normResults[idx]
+		if res.wavPath == "" || res.known {
+			continue
+		}
+		if !res.ok {
+			info, err := os.Stat(res.wavPath)
+			res.ok = err == nil && info.Size() > 44
+		}
+		if res.ok {
+			res.playEnd = trimSilenceEnd(res.wavPath)
+			normWavMu.Lock()
+			normWavEnds[res.wavPath] = res.playEnd
+			normWavMu.Unlock()
+		}
+	}
+
+	// Mark every WAV handed out as just used, so eviction removes the ones
+	// no recent render has needed.
+	now := time.Now()
+	for _, res := range normResults {
+		if res.ok {
+			os.Chtimes(res.wavPath, now, now)
+		}
+	}
+	if len(misses) > 0 {
+		evictNormWavs(cacheDir)
+	}
+	return normResults
+}
+
+// normWavKeepRecent protects WAVs used this recently from eviction, so a
+// render still reading its inputs never loses one to another render's
+// eviction pass.
+const normWavKeepRecent = 30 * time.Minute
+
+// normWavCacheBytes caps the total size of the normalized-WAV cache:
+// DJBOT_NORM_CACHE_MB, or 4 GB (about a hundred 4-minute tracks).
+func normWavCacheBytes() int64 {
+	if mb, err := strconv.ParseInt(os.Getenv("DJBOT_NORM_CACHE_MB"), 10, 64); err == nil && mb > 0 {
+		return mb << 20
+	}
+	return 4 << 30
+}
+
+// evictNormWavs deletes the least recently used norm_*.wav files in cacheDir
+// (by mtime, which prepareNormWavs refreshes on every use) until the cache
+// fits normWavCacheBytes, sparing those used within normWavKeepRecent.
+func evictNormWavs(cacheDir string) {
+	entries, err := os.ReadDir(cacheDir)
+	if err != nil {
+		return
+	}
+	type wavFile struct {
+		path  string
+		size  int64
+		mtime time.Time
+	}
+	var wavs []wavFile
+	var total int64
+	for _, e := range entries {
+		if e.IsDir() || !strings.HasPrefix(e.Name(), "norm_") || !strings.HasSuffix(e.Name(), ".wav") {
+			continue
+		}
+		info, err := e.Info()
+		if err != nil {
+			continue
+		}
+		wavs = append(wavs, wavFile{filepath.Join(cacheDir, e.Name()), info.Size(), info.ModTime()})
+		total += info.Size()
+	}
+	limit := normWavCacheBytes()
+	if total <= limit {
+		return
+	}
+	sort.Slice(wavs, func(i, j int) bool { return wavs[i].mtime.Before(wavs[j].mtime) })
+	cutoff := time.Now().Add(-normWavKeepRecent)
+	for _, w := range wavs {
+		if total <= limit || w.mtime.After(cutoff) {
+			break
+		}
+		if os.Remove(w.path) == nil {
+			total -= w.size
+			normWavMu.Lock()
+			delete(normWavEnds, w.path)
+			normWavMu.Unlock()
+			log.Printf("[cache] evicted %s", filepath.Base(w.path))
+		}
+	}
+}
+
+// sweepNormTemps removes norm_*.tmp files older than maxAge: half-written
+// WAVs left behind when a conversion was killed mid-way.
+func sweepNormTemps(cacheDir string, maxAge time.Duration) {
+	entries, err := os.ReadDir(cacheDir)
+	if err != nil {
+		return
+	}
+	cutoff := time.Now().Add(-maxAge)
+	for _, e := range entries {
+		if e.IsDir() || !strings.HasPrefix(e.Name(), "norm_") || !strings.HasSuffix(e.Name(), ".tmp") {
+			continue
+		}
+		if info, err := e.Info(); err == nil && info.ModTime().Before(cutoff) {
+			os.Remove(filepath.Join(cacheDir, e.Name()))
+		}
+	}
+}
+
+// PrewarmNormWavs normalizes a plan's sources into cacheDir in the
+// background, so the WAVs its mix render needs are usually ready by the time
+// it starts. The WAVs are subject to the same eviction as rendered ones.
+func PrewarmNormWavs(sources []string, cacheDir string) {
+	if len(sources) == 0 {
+		return
+	}
+	go func() {
+		start := time.Now()
+		prepareNormWavs(sources, cacheDir)
+		log.Printf("[prewarm] normalized %d track(s) in %v", len(sources), time.Since(start).Round(time.Millisecond))
+	}()
+}
+
 // RenderPreview renders a transition preview using ffmpeg filter_complex
 func RenderPreview(trackAPath, trackBPath string, spec TransitionSpec, cacheDir string) (string, error) {
 	margin := 10.0
@@ -176,7 +502,7 @@ func RenderPreview(trackAPath, trackBPath string, spec TransitionSpec, cacheDir
 		spec.Type, int(tOut), randHex(4)))
 
 	args := []string{
-		"-y",
+		"-y", "-nostdin", "-hide_banner", "-loglevel", "error",
 		"-ss", fmt.Sprintf("%.2f", aStart), "-t", fmt.Sprintf("%.2f", aDur), "-i", trackAPath,
 		"-ss", fmt.Sprintf("%.2f", bStart), "-t", fmt.Sprintf("%.2f", bDur), "-i", trackBPath,
 		"-filter_complex", filterComplex,
@@ -205,52 +531,30 @@ func RenderFinalMix(playlist []TrackEntry, transitions []TransitionSpec, outputP
 
 	log.Printf("[render mix] %d tracks, %d transitions (Go Native Mega filter_complex)", len(playlist), len(transitions))
 
-	// ── Parallel WAV normalization (up to 4 concurrent ffmpeg processes) ──
-	type normResult struct {
-		wavPath string
-		playEnd float64
-		ok      bool
-	}
-	normResults := make([]normResult, len(playlist))
-	var normWg sync.WaitGroup
-	normSem := make(chan struct{}, 4)
-
+	// ── Batched WAV normalization (up to 4 concurrent ffmpeg processes) ──
+	// A playlist may reference the same source more than once; each unique
+	// file is normalized once and the result is shared by every entry.
+	sourceIdx := make(map[string]int, len(playlist))
+	entrySource := make([]int, len(playlist))
+	var sources []string
 	for i, t := range playlist {
-		normWg.Add(1)
-		go func(idx int, track TrackEntry) {
-			defer normWg.Done()
-			normSem <- struct{}{}
-			defer func() { <-normSem }()
-
-			wavPath := filepath.Join(cacheDir, fmt.Sprintf("norm_%s.wav", randHex(6)))
-			var normStderr bytes.Buffer
-			cmd := exec.Command(ffmpegPath, "-y", "-i", track.Filepath,
-				"-map_metadata", "-1",
-				"-ar", "44100", "-ac", "2", "-sample_fmt", "s16",
-				"-af", "loudnorm=I=-14:TP=-1.5:LRA=11",
-				wavPath,
-			)
-			hideWindow(cmd)
-			cmd.Stderr = &normStderr
-			if err := cmd.Run(); err != nil {
-				log.Printf("Warning: failed to convert to wav [%d]: %v", idx, err)
-				return
-			}
-			normResults[idx] = normResult{
-				wavPath: wavPath,
-				playEnd: trimSilenceEnd(wavPath),
-				ok:      true,
-			}
-		}(i, t)
+		idx, seen := sourceIdx[t.Filepath]
+		if !seen {
+			idx = len(sources)
+			sourceIdx[t.Filepath] = idx
+			sources = append(sources, t.Filepath)
+		}
+		entrySource[i] = idx
 	}
-	normWg.Wait()
+	normResults := prepareNormWavs(sources, cacheDir)
 
 	// Apply normalization results (sequential, no race)
-	var wavMap []string
-	for i, res := range normResults {
+	normalized := make([]bool, len(playlist))
+	for i := range playlist {
+		res := normResults[entrySource[i]]
 		if res.ok {
+			normalized[i] = true
 			playlist[i].Filepath = res.wavPath
-			wavMap = append(wavMap, res.wavPath)
 			if playlist[i].PlayEnd <= 0 || playlist[i].PlayEnd > res.playEnd {
 				playlist[i].PlayEnd = res.playEnd
 			}
@@ -263,7 +567,6 @@ func RenderFinalMix(playlist []TrackEntry, transitions []TransitionSpec, outputP
 	// (byte count) instead of the theory value, eliminating
 	// the LRC drift that accumulates over many tracks.
 	// -------------------------------------------------------
-	var canvas []float32
 	var trackStarts []struct {
 		OffsetMs int
 		Name     string
@@ -286,6 +589,9 @@ func RenderFinalMix(playlist []TrackEntry, transitions []TransitionSpec, outputP
 	fades := make([]fadeInfo, len(playlist))
 
 	// Pre-pass: compute xfade durations using theory lengths only for clamping.
+	// The same theory lengths give the expected mix length, used below to
+	// allocate the canvas once instead of regrowing it for every track.
+	estimatedMs := 0
 	{
 		prevTheoryMs := 0
 		for i := 0; i < len(playlist); i++ {
@@ -295,100 +601,30 @@ func RenderFinalMix(playlist []TrackEntry, transitions []TransitionSpec, outputP
 
 			if i > 0 {
 				trans := transitions[i-1]
-				xfadeMs := int(math.Round(trans.Duration * 1000.0))
-
-				avgBPM := (playlist[i-1].BPM + t.BPM) / 2.0
-				if avgBPM <= 0 {
-					avgBPM = 120.0
-				}
-				barDur := 4.0 * 60.0 / avgBPM
-				minXfadeMs := int(math.Round(2.0 * barDur * 1000.0)) // 2 bars
-				if minXfadeMs < 8000 {
-					minXfadeMs = 8000
-				}
-				if xfadeMs < minXfadeMs {
-					xfadeMs = minXfadeMs
-				}
-
-				maxByPrev := prevTheoryMs - 1000
-				maxByB := int(chunkTheorySec*1000.0) - 5000
-				maxBy40pct := int(math.Min(float64(prevTheoryMs), chunkTheorySec*1000.0) * 0.4)
-
-				if xfadeMs > maxByPrev && maxByPrev > 0 {
-					xfadeMs = maxByPrev
-				}
-				if xfadeMs > maxByB && maxByB > 0 {
-					xfadeMs = maxByB
-				}
-				if xfadeMs > maxBy40pct && maxBy40pct > 0 {
-					xfadeMs = maxBy40pct
-				}
-				if xfadeMs < 0 {
-					xfadeMs = 0
-				}
+				xfadeMs := clampXfadeMs(trans.Duration, playlist[i-1].BPM, t.BPM, prevTheoryMs, chunkTheorySec)
 				fadeSec := float64(xfadeMs) / 1000.0
 				fades[i].EntryFade = fadeSec
 				fades[i].EntryType = trans.Type
 				fades[i-1].ExitFade = fadeSec
 				fades[i-1].ExitType = trans.Type
+				estimatedMs -= xfadeMs
 			}
 			prevTheoryMs = int(math.Round(chunkTheorySec * 1000.0))
+			estimatedMs += prevTheoryMs
 		}
 	}
 
-	// Main single loop: for each track, clamp xfade using prevActualChunkMs,
-	// extract PCM, record LRC from real offsetSamples, mix into canvas.
-	for i := 0; i < len(playlist); i++ {
-		t := playlist[i]
+	// One second of headroom absorbs the gap between theory and real PCM
+	// lengths; anything beyond that falls back to append's amortized growth.
+	canvas := make([]float32, 0, int(float64(estimatedMs+1000)/1000.0*44100.0)*2)
 
+	// chunkArgs builds the ffmpeg arguments that decode track i's play window
+	// to f32le on stdout. They depend only on
+	// the track and the pre-pass fades, never on the timeline, so a chunk can
+	// be started ahead of time.
+	chunkArgs := func(i int) []string {
+		t := playlist[i]
 		startSec, endSec := clampPlayBounds(t.PlayStart, t.PlayEnd, t.Duration)
-		chunkTheorySec := endSec - startSec
-
-		// ── Step 1: xfade clamping (actual prev chunk length) ──────────────
-		if i > 0 {
-			trans := transitions[i-1]
-			xfadeMs := int(math.Round(trans.Duration * 1000.0))
-
-			avgBPM := (playlist[i-1].BPM + t.BPM) / 2.0
-			if avgBPM <= 0 {
-				avgBPM = 120.0
-			}
-			barDur := 4.0 * 60.0 / avgBPM
-			minXfadeMs := int(math.Round(2.0 * barDur * 1000.0)) // 2 bars
-			if minXfadeMs < 8000 {
-				minXfadeMs = 8000
-			}
-			if xfadeMs < minXfadeMs {
-				xfadeMs = minXfadeMs
-			}
-
-			// Use prevActualChunkMs (real PCM size) — not theory
-			maxByPrev := prevActualChunkMs - 1000
-			maxByB := int(chunkTheorySec*1000.0) - 5000
-			maxBy40pct := int(math.Min(float64(prevActualChunkMs), chunkTheorySec*1000.0) * 0.4)
-
-			if xfadeMs > maxByPrev && maxByPrev > 0 {
-				xfadeMs = maxByPrev
-			}
-			if xfadeMs > maxByB && maxByB > 0 {
-				xfadeMs = maxByB
-			}
-			if xfadeMs > maxBy40pct && maxBy40pct > 0 {
-				xfadeMs = maxBy40pct
-			}
-			if xfadeMs < 0 {
-				xfadeMs = 0
-			}
-
-			// ── Step 2: overlay position ───────────────────────────────────
-			currentOffsetMs -= xfadeMs
-			if currentOffsetMs < 0 {
-				currentOffsetMs = 0
-			}
-		}
-
-		log.Printf("[render] track[%d] %s: start=%.1fs end=%.1fs offset=%dms (prevActual=%dms)",
-			i, t.Filename, startSec, endSec, currentOffsetMs, prevActualChunkMs)
 
 		// Build FFmpeg filter chain (entry/exit fades from pre-pass)
 		f := fades[i]
@@ -406,7 +642,9 @@ func RenderFinalMix(playlist []TrackEntry, transitions []TransitionSpec, outputP
 			gainDB = -10.0
 		}
 
-		baseFilter := fmt.Sprintf("atrim=start=%.3f:end=%.3f,asetpts=PTS-STARTPTS,volume=%.2fdB", startSec, endSec, gainDB)
+		// The play window is cut by input-side -ss/-t below, so the chain
+		// starts at PTS 0 without an atrim/asetpts stage.
+		baseFilter := fmt.Sprintf("volume=%.2fdB", gainDB)
 
 		entryFilter := ""
 		if f.EntryFade > 0 {
@@ -445,31 +683,116 @@ func RenderFinalMix(playlist []TrackEntry, transitions []TransitionSpec, outputP
 		}
 
 		filterChain := baseFilter + entryFilter + exitFilter
-		pcmPath := filepath.Join(cacheDir, fmt.Sprintf("chunk_%d_%s.pcm", i, randHex(4)))
 
-		// ── Step 3: FFmpeg → PCM ───────────────────────────────────────────
-		var chunkStderr bytes.Buffer
-		cmdRaw := exec.Command(ffmpegPath,
-			"-y", "-i", t.Filepath,
+		// FFmpeg → PCM (piped)
+		// -loglevel error keeps stderr empty on success; it is only read to
+		// report a failure.
+		// -ss/-t before -i make ffmpeg seek the demuxer and decode only the
+		// play window; PCM is read from stdout instead of a temp file.
+		// Normalized WAVs are already 44.1 kHz stereo, so only the raw-source
+		// fallback needs the resample/downmix stage.
+		rawArgs := []string{
+			"-nostdin", "-hide_banner", "-loglevel", "error",
+			"-ss", fmt.Sprintf("%.3f", startSec), "-t", fmt.Sprintf("%.3f", durRaw),
+			"-i", t.Filepath,
 			"-map_metadata", "-1",
 			"-af", filterChain,
-			"-f", "f32le", "-ar", "44100", "-ac", "2",
-			pcmPath,
-		)
-		hideWindow(cmdRaw)
-		cmdRaw.Stderr = &chunkStderr
-		if err := cmdRaw.Run(); err != nil {
-			log.Printf("Warning: failed to extract PCM chunk %d: %v\n%s", i, err, chunkStderr.String())
-			continue
+			"-f", "f32le",
+		}
+		if !normalized[i] {
+			rawArgs = append(rawArgs, "-ar", "44100", "-ac", "2")
+		}
+		rawArgs = append(rawArgs, "-")
+		return rawArgs
+	}
+
+	// startChunk launches the extraction for track i ahead of time. Each
+	// chunk's PCM stays in its ffmpeg stdout pipe until the loop reaches it
+	// and streams it into the canvas, so the lookahead hides process start-up,
+	// seeking and the first pipe-buffer of decoding while holding no more
+	// than the pipe buffers in memory, rather than a whole decoded track per
+	// chunk in flight.
+	type chunkProc struct {
+		cmd    *exec.Cmd
+		stdout io.ReadCloser
+		stderr bytes.Buffer
+		err    error // failure to start
+	}
+	startChunk := func(i int) *chunkProc {
+		cp := &chunkProc{cmd: exec.Command(ffmpegPath, chunkArgs(i)...)}
+		hideWindow(cp.cmd)
+		cp.cmd.Stderr = &cp.stderr
+		if cp.stdout, cp.err = cp.cmd.StdoutPipe(); cp.err == nil {
+			cp.err = cp.cmd.Start()
+		}
+		return cp
+	}
+
+	lookahead := runtime.NumCPU()
+	if lookahead > 4 {
+		lookahead = 4
+	}
+	inflight := make([]*chunkProc, 0, lookahead)
+	nextChunk := 0
+	for ; nextChunk < len(playlist) && nextChunk < lookahead; nextChunk++ {
+		inflight = append(inflight, startChunk(nextChunk))
+	}
+
+	// Main single loop: for each track, clamp xfade using prevActualChunkMs,
+	// extract PCM, record LRC from real offsetSamples, mix into canvas.
+	for i := 0; i < len(playlist); i++ {
+		t := playlist[i]
+
+		startSec, endSec := clampPlayBounds(t.PlayStart, t.PlayEnd, t.Duration)
+		chunkTheorySec := endSec - startSec
+
+		// ── Step 1: xfade clamping (actual prev chunk length) ──────────────
+		if i > 0 {
+			trans := transitions[i-1]
+			// Use prevActualChunkMs (real PCM size) — not theory
+			xfadeMs := clampXfadeMs(trans.Duration, playlist[i-1].BPM, t.BPM, prevActualChunkMs, chunkTheorySec)
+
+			// ── Step 2: overlay position ───────────────────────────────────
+			currentOffsetMs -= xfadeMs
+			if currentOffsetMs < 0 {
+				currentOffsetMs = 0
+			}
 		}
 
-		// ── Step 4: read PCM → real sample count ───────────────────────────
-		b, err := os.ReadFile(pcmPath)
+		log.Printf("[render] track[%d] %s: start=%.1fs end=%.1fs offset=%dms (prevActual=%dms)",
+			i, t.Filename, startSec, endSec, currentOffsetMs, prevActualChunkMs)
+
+		// ── Step 3: take this track's chunk, refill the lookahead ──────────
+		cur := inflight[0]
+		inflight[0] = nil
+		inflight = inflight[1:]
+		if nextChunk < len(playlist) {
+			inflight = append(inflight, startChunk(nextChunk))
+			nextChunk++
+		}
+
+		// ── Step 4: PCM → canvas additive overlay ─────────────────────────
+		// The returned count is the real decoded length that drives the
+		// timeline below.
+		offsetSamples := int(float64(currentOffsetMs)/1000.0*44100.0) * 2
+		var pcmFloatCount int
+		err := cur.err
+		if err == nil {
+			canvas, pcmFloatCount, err = overlayPCM(canvas, offsetSamples, cur.stdout)
+			if err != nil {
+				cur.cmd.Process.Kill()
+			}
+			if waitErr := cur.cmd.Wait(); err == nil {
+				err = waitErr
+			}
+		}
 		if err != nil {
-			log.Printf("Warning: failed to read PCM chunk %d: %v", i, err)
-			continue
+			log.Printf("Warning: failed to extract PCM chunk %d: %v\n%s", i, err, cur.stderr.String())
+			if pcmFloatCount == 0 {
+				continue
+			}
+			// Keep what was already mixed so the timeline stays aligned with it.
 		}
-		pcmFloatCount := len(b) / 4
 
 		// ── Step 5: LRC trackStarts — from real currentOffsetMs ───────────
 		trackStarts = append(trackStarts, struct {
@@ -477,58 +800,22 @@ func RenderFinalMix(playlist []TrackEntry, transitions []TransitionSpec, outputP
 			Name     string
 		}{currentOffsetMs, t.Filename})
 
-		// ── Step 6: canvas additive overlay ───────────────────────────────
-		offsetSamples := int(float64(currentOffsetMs)/1000.0*44100.0) * 2
-		requiredLen := offsetSamples + pcmFloatCount
-		if len(canvas) < requiredLen {
-			newCanvas := make([]float32, requiredLen)
-			copy(newCanvas, canvas)
-			canvas = newCanvas
-		}
-		for j := 0; j < pcmFloatCount; j++ {
-			canvas[offsetSamples+j] += math.Float32frombits(binary.LittleEndian.Uint32(b[j*4 : j*4+4]))
-		}
-		os.Remove(pcmPath)
-
-		// ── Step 7: prevActualChunkMs from real byte count ─────────────────
+		// ── Step 6: prevActualChunkMs from real sample count ──────────────
 		prevActualChunkMs = pcmFloatCount * 1000 / (44100 * 2)
 
-		// ── Step 8: advance timeline ───────────────────────────────────────
+		// ── Step 7: advance timeline ───────────────────────────────────────
 		currentOffsetMs += prevActualChunkMs
 	}
 
-	// ── Phase 2 (A-5): End Fadeout (last 3 seconds) ─────────────────────
-	if len(canvas) > 0 {
-		fadeLen := 3 * 44100 * 2
-		if fadeLen > len(canvas) {
-			fadeLen = len(canvas)
-		}
-		startIdx := len(canvas) - fadeLen
-		for i := 0; i < fadeLen; i++ {
-			canvas[startIdx+i] *= 1.0 - float32(i)/float32(fadeLen)
-		}
-	}
-
 	// -----------------------------------------------------
-	// Write Master Canvas to Disk & Encode Final MP3
+	// Stream Master Canvas to FFmpeg & Encode Final MP3
 	// -----------------------------------------------------
-	finalPcmPath := filepath.Join(cacheDir, fmt.Sprintf("final_canvas_%s.pcm", randHex(4)))
-
-	// Pre-allocate byte array for max speed
-	outPcmBytes := make([]byte, len(canvas)*4)
-	for j, v := range canvas {
-		binary.LittleEndian.PutUint32(outPcmBytes[j*4:j*4+4], math.Float32bits(v))
-	}
-
-	if err := os.WriteFile(finalPcmPath, outPcmBytes, 0644); err != nil {
-		return "", "", fmt.Errorf("failed to drop master PCM to disk: %w", err)
-	}
-
 	log.Printf("[ffmpeg] encoding final mp3 from master PCM overlay...")
+	// stdin carries the PCM here, so -nostdin does not apply.
 	encodeArgs := []string{
-		"-y",
+		"-y", "-hide_banner", "-loglevel", "error",
 		"-f", "f32le", "-ar", "44100", "-ac", "2",
-		"-i", finalPcmPath,
+		"-i", "-",
 		"-af", "alimiter=limit=0.89:attack=5:release=50:level=false",
 		"-b:a", "320k", "-q:a", "0",
 		outputPath,
@@ -538,35 +825,168 @@ func RenderFinalMix(playlist []TrackEntry, transitions []TransitionSpec, outputP
 	encCmd := exec.Command(ffmpegPath, encodeArgs...)
 	hideWindow(encCmd)
 	encCmd.Stderr = &encStderr
-	if err := encCmd.Run(); err != nil {
-		return "", "", fmt.Errorf("failed to encode final mp3: %w\n%s", err, encStderr.String())
+	encStdin, err := encCmd.StdinPipe()
+	if err != nil {
+		return "", "", fmt.Errorf("failed to open encoder stdin: %w", err)
+	}
+	if err := encCmd.Start(); err != nil {
+		return "", "", fmt.Errorf("failed to start mp3 encoder: %w", err)
 	}
 
-	os.Remove(finalPcmPath)
+	// ── Phase 2 (A-5): End Fadeout (last 3 seconds) fused into serialization ──
+	writeErr := writeMasterPCM(encStdin, canvas, 3*44100*2)
+	encStdin.Close()
+	if err := encCmd.Wait(); err != nil {
+		return "", "", fmt.Errorf("failed to encode final mp3: %w\n%s", err, encStderr.String())
+	}
+	if writeErr != nil {
+		return "", "", fmt.Errorf("failed to stream master PCM to encoder: %w", writeErr)
+	}
 
 	// Write LRC
 	lrcPath := strings.TrimSuffix(outputPath, filepath.Ext(outputPath)) + ".lrc"
+	const lrcHeader = "[ar:DJ Bot Auto Mix]\n[ti:Go Native PCM Canvas Mix]\n[al:Auto Generated]\n[by:DJ Bot]\n\n"
 	var lrcSb strings.Builder
-	lrcSb.WriteString("[ar:DJ Bot Auto Mix]\n[ti:Go Native PCM Canvas Mix]\n[al:Auto Generated]\n[by:DJ Bot]\n\n")
+	lrcSb.Grow(len(lrcHeader) + len(trackStarts)*64)
+	lrcSb.WriteString(lrcHeader)
 
 	for _, ts := range trackStarts {
 		sec := float64(ts.OffsetMs) / 1000.0
 		m := int(sec) / 60
 		s := sec - float64(m*60)
 		name := strings.TrimSuffix(ts.Name, filepath.Ext(ts.Name))
-		lrcSb.WriteString(fmt.Sprintf("[%02d:%05.2f] %s\n", m, s, name))
+		fmt.Fprintf(&lrcSb, "[%02d:%05.2f] %s\n", m, s, name)
 	}
-	os.WriteFile(lrcPath, []byte(lrcSb.String()), 0644)
-
-	// Cleanup Normalized WAVs
-	for _, wPath := range wavMap {
-		os.Remove(wPath)
+	// Single write to a temp file, then rename, so a reader never sees a
+	// half-written LRC next to a finished mp3. The mix is already in place by
+	// now, so a failed LRC is logged and left out rather than failing it.
+	lrcTmp := lrcPath + ".tmp"
+	err = os.WriteFile(lrcTmp, []byte(lrcSb.String()), 0644)
+	if err == nil {
+		err = os.Rename(lrcTmp, lrcPath)
+	}
+	if err != nil {
+		os.Remove(lrcTmp)
+		log.Printf("[warn] mix created but lrc could not be written: %v", err)
+		return outputPath, "", nil
 	}
 
 	log.Printf("[done] canvas overlay successfully created mix: %s, lrc: %s", outputPath, lrcPath)
 	return outputPath, lrcPath, nil
 }
 
+// clampXfadeMs turns a transition's requested duration into the crossfade
+// actually used, in ms: at least 2 bars (and 8 s), but leaving 1 s of the
+// previous chunk, 5 s of the incoming one, and at most 40% of the shorter.
+// prevMs is the previous chunk's length; chunkSec the incoming chunk's.
+func clampXfadeMs(durationSec, bpmA, bpmB float64, prevMs int, chunkSec float64) int {
+	xfadeMs := int(math.Round(durationSec * 1000.0))
+
+	avgBPM := (bpmA + bpmB) / 2.0
+	if avgBPM <= 0 {
+		avgBPM = 120.0
+	}
+	barDur := 4.0 * 60.0 / avgBPM
+	minXfadeMs := int(math.Round(2.0 * barDur * 1000.0)) // 2 bars
+	if minXfadeMs < 8000 {
+		minXfadeMs = 8000
+	}
+	if xfadeMs < minXfadeMs {
+		xfadeMs = minXfadeMs
+	}
+
+	maxByPrev := prevMs - 1000
+	maxByB := int(chunkSec*1000.0) - 5000
+	maxBy40pct := int(math.Min(float64(prevMs), chunkSec*1000.0) * 0.4)
+
+	if xfadeMs > maxByPrev && maxByPrev > 0 {
+		xfadeMs = maxByPrev
+	}
+	if xfadeMs > maxByB && maxByB > 0 {
+		xfadeMs = maxByB
+	}
+	if xfadeMs > maxBy40pct && maxBy40pct > 0 {
+		xfadeMs = maxBy40pct
+	}
+	if xfadeMs < 0 {
+		xfadeMs = 0
+	}
+	return xfadeMs
+}
+
+// overlayPCM streams little-endian f32 PCM from r and adds it into canvas
+// starting at offset, growing the canvas as samples arrive. Samples are
+// decoded from a fixed 256 KB read buffer straight into the mix, so no
+// per-track copy of the chunk is kept. It returns the (possibly reallocated)
+// canvas and the number of samples mixed in.
+func overlayPCM(canvas []float32, offset int, r io.Reader) ([]float32, int, error) {
+	buf := make([]byte, 256*1024)
+	n, carry := 0, 0
+	for {
+		m, err := r.Read(buf[carry:])
+		m += carry
+		whole := m / 4
+		if whole > 0 {
+			need := offset + n + whole
+			if len(canvas) < need {
+				canvas = append(canvas, make([]float32, need-len(canvas))...)
+			}
+			dst := canvas[offset+n : need]
+			for k := range dst {
+				dst[k] += math.Float32frombits(binary.LittleEndian.Uint32(buf[k*4:]))
+			}
+			n += whole
+		}
+		// A read can end mid-sample; keep the partial bytes for the next one.
+		carry = copy(buf, buf[whole*4:m])
+		if err == io.EOF {
+			return canvas, n, nil
+		}
+		if err != nil {
+			return canvas, n, err
+		}
+	}
+}
+
+// writeMasterPCM streams the master canvas to w as little-endian f32 and
+// applies the closing linear fade-out over the last fadeLen samples in the same
+// pass. Samples are serialized through a fixed 1 MB buffer, so the canvas is
+// traversed once and never duplicated as a full-size byte slice.
+func writeMasterPCM(w io.Writer, canvas []float32, fadeLen int) error {
+	if fadeLen > len(canvas) {
+		fadeLen = len(canvas)
+	}
+	fadeLen -= fadeLen % 2 // whole stereo frames only
+	fadeStart := len(canvas) - fadeLen
+
+	// One gain per stereo frame, derived from a precomputed step rather than
+	// a division for every sample.
+	var step float32
+	if frames := fadeLen / 2; frames > 0 {
+		step = 1.0 / float32(frames)
+	}
+
+	const bufSamples = 1 << 18 // 1 MB of f32
+	buf := make([]byte, bufSamples*4)
+	for base := 0; base < len(canvas); base += bufSamples {
+		end := base + bufSamples
+		if end > len(canvas) {
+			end = len(canvas)
+		}
+		for j := base; j < end; j++ {
+			v := canvas[j]
+			if j >= fadeStart {
+				v *= 1.0 - float32((j-fadeStart)/2)*step
+			}
+			binary.LittleEndian.PutUint32(buf[(j-base)*4:], math.Float32bits(v))
+		}
+		if _, err := w.Write(buf[:(end-base)*4]); err != nil {
+			return err
+		}
+	}
+	return nil
+}
+
 func buildAtempoFilter(speed float64, pitchStep float64) string {
 	filter := ""
 
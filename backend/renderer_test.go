@@ -0,0 +1,168 @@
+package main
+
+import (
+	"bytes"
+	"encoding/binary"
+	"math"
+	"os"
+	"path/filepath"
+	"testing"
+	"testing/iotest"
+	"time"
+)
+
+func TestWriteMasterPCMFade(t *testing.T) {
+	canvas := make([]float32, 20)
+	for i := range canvas {
+		canvas[i] = 1.0
+	}
+	var buf bytes.Buffer
+	if err := writeMasterPCM(&buf, canvas, 8); err != nil { // 4 stereo frames of fade
+		t.Fatal(err)
+	}
+	out := buf.Bytes()
+
+	got := make([]float32, len(canvas))
+	for i := range got {
+		got[i] = math.Float32frombits(binary.LittleEndian.Uint32(out[i*4:]))
+	}
+
+	for i := 0; i < 12; i++ {
+		if got[i] != 1.0 {
+			t.Fatalf("sample %d before fade = %v, want 1", i, got[i])
+		}
+	}
+	want := []float32{1.0, 0.75, 0.5, 0.25}
+	for f, w := range want {
+		l, r := got[12+f*2], got[13+f*2]
+		if l != w || r != w {
+			t.Errorf("fade frame %d = (%v, %v), want %v on both channels", f, l, r, w)
+		}
+	}
+}
+
+func TestOverlayPCMPartialReads(t *testing.T) {
+	pcm := make([]byte, 6*4)
+	for i := 0; i < 6; i++ {
+		binary.LittleEndian.PutUint32(pcm[i*4:], math.Float32bits(float32(i)))
+	}
+	canvas := []float32{10, 10, 10, 10}
+
+	// One byte per Read forces every sample to straddle reads.
+	canvas, n, err := overlayPCM(canvas, 2, iotest.OneByteReader(bytes.NewReader(pcm)))
+	if err != nil {
+		t.Fatal(err)
+	}
+	if n != 6 {
+		t.Fatalf("mixed %d samples, want 6", n)
+	}
+	want := []float32{10, 10, 10, 11, 2, 3, 4, 5}
+	if len(canvas) != len(want) {
+		t.Fatalf("canvas len = %d, want %d", len(canvas), len(want))
+	}
+	for i, w := range want {
+		if canvas[i] != w {
+			t.Errorf("canvas[%d] = %v, want %v", i, canvas[i], w)
+		}
+	}
+}
+
+func TestPrepareNormWavsRechecksRememberedWav(t *testing.T) {
+	dir := t.TempDir()
+	src := filepath.Join(dir, "track.mp3")
+	if err := os.WriteFile(src, []byte("audio"), 0644); err != nil {
+		t.Fatal(err)
+	}
+	wav, err := normWavPath(dir, src)
+	if err != nil {
+		t.Fatal(err)
+	}
+	oldFFmpeg := ffmpegPath
+	ffmpegPath = filepath.Join(dir, "no-ffmpeg") // any conversion fails
+	t.Cleanup(func() { ffmpegPath = oldFFmpeg; forgetNormWavs() })
+
+	normWavMu.Lock()
+	normWavEnds[wav] = 42
+	normWavMu.Unlock()
+
+	// Remembered but deleted: the entry must not be trusted.
+	if res := prepareNormWavs([]string{src}, dir)[0]; res.ok {
+		t.Fatalf("missing wav reported ok: %+v", res)
+	}
+	normWavMu.Lock()
+	_, still := normWavEnds[wav]
+	normWavMu.Unlock()
+	if still {
+		t.Error("stale normWavEnds entry was kept")
+	}
+
+	// Remembered and present: the play end is reused without a scan.
+	if err := os.WriteFile(wav, make([]byte, 100), 0644); err != nil {
+		t.Fatal(err)
+	}
+	normWavMu.Lock()
+	normWavEnds[wav] = 42
+	normWavMu.Unlock()
+	if res := prepareNormWavs([]string{src}, dir)[0]; !res.ok || !res.known || res.playEnd != 42 {
+		t.Errorf("present wav = %+v, want ok, known, playEnd 42", res)
+	}
+}
+
+func TestEvictNormWavsOldestFirst(t *testing.T) {
+	dir := t.TempDir()
+	t.Setenv("DJBOT_NORM_CACHE_MB", "1")
+	now := time.Now()
+	ages := map[string]time.Duration{
+		"norm_a.wav": 4 * time.Hour,
+		"norm_b.wav": 3 * time.Hour,
+		"norm_c.wav": 2 * time.Hour,
+		"norm_d.wav": time.Minute, // in use by a render: never evicted
+		"other.wav":  5 * time.Hour,
+	}
+	for name, age := range ages {
+		p := filepath.Join(dir, name)
+		if err := os.WriteFile(p, make([]byte, 600<<10), 0644); err != nil {
+			t.Fatal(err)
+		}
+		os.Chtimes(p, now.Add(-age), now.Add(-age))
+	}
+
+	evictNormWavs(dir)
+
+	for name, want := range map[string]bool{
+		"norm_a.wav": false, "norm_b.wav": false, "norm_c.wav": false,
+		// Still over the cap, but recently used and so kept.
+		"norm_d.wav": true,
+		"other.wav":  true,
+	} {
+		_, err := os.Stat(filepath.Join(dir, name))
+		if got := err == nil; got != want {
+			t.Errorf("%s present = %v, want %v", name, got, want)
+		}
+	}
+}
+
+func TestSweepNormTemps(t *testing.T) {
+	dir := t.TempDir()
+	old := time.Now().Add(-2 * time.Hour)
+	for _, name := range []string{"norm_a.wav.1f2e.tmp", "norm_b.wav.3c4d.tmp", "norm_c.wav"} {
+		if err := os.WriteFile(filepath.Join(dir, name), nil, 0644); err != nil {
+			t.Fatal(err)
+		}
+	}
+	os.Chtimes(filepath.Join(dir, "norm_a.wav.1f2e.tmp"), old, old)
+	os.Chtimes(filepath.Join(dir, "norm_c.wav"), old, old)
+
+	sweepNormTemps(dir, time.Hour)
+
+	for name, want := range map[string]bool{
+		"norm_a.wav.1f2e.tmp": false, // abandoned
+		"norm_b.wav.3c4d.tmp": true,  // may still be being written
+		"norm_c.wav":          true,
+	} {
+		_, err := os.Stat(filepath.Join(dir, name))
+		if got := err == nil; got != want {
+			t.Errorf("%s present = %v, want %v", name, got, want)
+		}
+	}
+}
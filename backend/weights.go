@@ -6,6 +6,7 @@ import (
 	"net/http"
 	"os"
 	"path/filepath"
+	"sync"
 )
 
 // weightsFilePath is set to an absolute path by main() after dirs are configured.
@@ -34,6 +35,9 @@ type WeightsConfig struct {
 	BarWeights  map[int]float64    `json:"bar_weights"`
 }
 
+// weightsMu serializes saves, which share one temp file name.
+var weightsMu sync.Mutex
+
 // loadWeights reads weights from disk, falling back to defaults.
 func loadWeights() WeightsConfig {
 	data, err := os.ReadFile(weightsFilePath)
@@ -48,17 +52,24 @@ func loadWeights() WeightsConfig {
 	return cfg
 }
 
-// saveWeights persists weights to disk.
+// saveWeights persists weights to disk atomically (temp file + rename), so a
+// crash mid-write never leaves a truncated weights file behind.
 func saveWeights(cfg WeightsConfig) error {
 	data, err := json.MarshalIndent(cfg, "", "  ")
 	if err != nil {
 		return err
 	}
+	weightsMu.Lock()
+	defer weightsMu.Unlock()
 	dir := filepath.Dir(weightsFilePath)
 	if dir != "." {
 		os.MkdirAll(dir, 0755)
 	}
-	return os.WriteFile(weightsFilePath, data, 0644)
+	tmp := weightsFilePath + ".tmp"
+	if err := os.WriteFile(tmp, data, 0644); err != nil {
+		return err
+	}
+	return os.Rename(tmp, weightsFilePath)
 }
 
 // handleGetWeights returns current weights (file or defaults).
@@ -0,0 +1,74 @@
+package main
+
+import (
+	"bytes"
+	"encoding/json"
+	"net/http"
+	"net/http/httptest"
+	"os"
+	"path/filepath"
+	"sync"
+	"testing"
+)
+
+func withWeightsFile(t *testing.T, path string) {
+	t.Helper()
+	old := weightsFilePath
+	weightsFilePath = path
+	t.Cleanup(func() { weightsFilePath = old })
+}
+
+func postWeights(cfg WeightsConfig) *httptest.ResponseRecorder {
+	body, _ := json.Marshal(cfg)
+	rec := httptest.NewRecorder()
+	handleSaveWeights(rec, httptest.NewRequest(http.MethodPost, "/weights", bytes.NewReader(body)))
+	return rec
+}
+
+func TestSaveWeightsConcurrent(t *testing.T) {
+	withWeightsFile(t, filepath.Join(t.TempDir(), "preference_weights.json"))
+
+	const n = 16
+	var wg sync.WaitGroup
+	for i := 0; i < n; i++ {
+		wg.Add(1)
+		go func(i int) {
+			defer wg.Done()
+			cfg := DefaultWeights()
+			cfg.TypeWeights["cut"] = float64(i)
+			if rec := postWeights(cfg); rec.Code != http.StatusOK {
+				t.Errorf("save %d: status %d: %s", i, rec.Code, rec.Body)
+			}
+		}(i)
+	}
+	wg.Wait()
+
+	// Every save was on disk before its reply, and the last one left a
+	// complete file behind.
+	data, err := os.ReadFile(weightsFilePath)
+	if err != nil {
+		t.Fatal(err)
+	}
+	var got WeightsConfig
+	if err := json.Unmarshal(data, &got); err != nil {
+		t.Fatalf("weights file is not valid JSON: %v", err)
+	}
+	if c := got.TypeWeights["cut"]; c < 0 || c >= n || c != float64(int(c)) {
+		t.Errorf("cut weight = %v, want one of the saved values", c)
+	}
+	if _, err := os.Stat(weightsFilePath + ".tmp"); !os.IsNotExist(err) {
+		t.Errorf("temp file left behind: %v", err)
+	}
+}
+
+func TestSaveWeightsReportsWriteError(t *testing.T) {
+	blocker := filepath.Join(t.TempDir(), "file")
+	if err := os.WriteFile(blocker, nil, 0644); err != nil {
+		t.Fatal(err)
+	}
+	withWeightsFile(t, filepath.Join(blocker, "preference_weights.json"))
+
+	if rec := postWeights(DefaultWeights()); rec.Code != http.StatusInternalServerError {
+		t.Errorf("status = %d, want 500", rec.Code)
+	}
+}